@@ -1,13 +1,21 @@
+from functools import partial
 from flask import Flask, render_template, redirect, url_for
 from flask_login import LoginManager, current_user
 from config import Config
-from models import db
+from models import db, co_registration_matrix, minhash_index
 from models.user import User
 from views.auth import auth_bp
 from views.student import student_bp
 from views.admin import admin_bp
-from extensions import mail  # import here
+from views.api import api_bp
+from extensions import mail, recommendation_cache, tracer, query_budget, event_broker, background, reminder_scheduler  # import here
 from utils.certificate_generator import CertificateGenerator
+from commands import register_commands
+from models.schema import upgrade_schema
+from models.event_lifecycle import EventLifecycle
+from models.trending import TrendingIndex
+from utils.email_utils import drain_outbox
+from utils.notifications import deliver_notifications
 
 def create_app():
     app = Flask(__name__)
@@ -17,6 +25,12 @@ def create_app():
     # init extensions
     db.init_app(app)
     mail.init_app(app)
+    recommendation_cache.init_app(app)
+    tracer.init_app(app)
+    query_budget.init_app(app)
+    event_broker.init_app(app)
+    background.init_app(app)
+    reminder_scheduler.init_app(app)
 
     # flask-login setup
     login_manager = LoginManager()
@@ -32,9 +46,26 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(student_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
 
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+
+    register_commands(app)
+    # Only 'user' collaborative mode reads the neighbour structures; a refresh is a full scan
+    if app.config.get('RECOMMENDER_COLLABORATIVE_MODE') == 'user':
+        if app.config.get('RECOMMENDER_SIMILAR_USERS') == 'lsh':
+            background.every(app.config.get('RECOMMENDER_LSH_MAX_AGE'), partial(
+                minhash_index.refresh, app.config.get('RECOMMENDER_LSH_BANDS'), app.config.get('RECOMMENDER_LSH_ROWS')
+            ), 'minhash-index')
+        else:
+            background.every(app.config.get('RECOMMENDER_MATRIX_MAX_AGE'), co_registration_matrix.refresh, 'co-registration-matrix')
+    background.every(app.config.get('TRENDING_PRUNE_INTERVAL'), TrendingIndex.prune_past_events, 'trending-prune')
+    background.every(app.config.get('EVENT_LIFECYCLE_INTERVAL'), EventLifecycle.advance, 'event-lifecycle')
+    background.every(app.config.get('MAIL_OUTBOX_INTERVAL'), drain_outbox, 'mail-outbox')
+    background.every(app.config.get('NOTIFICATION_INTERVAL'), deliver_notifications, 'notifications')
+    background.every(app.config.get('REMINDER_TICK'), reminder_scheduler.tick, 'reminders')
 
     @app.route('/')
     def index():
@@ -0,0 +1,343 @@
+"""Micro-benchmarks for the recommendation engine on synthetic SQLite data.
+
+Builds a throwaway database per dataset size with power-law registrations,
+then times each pipeline stage for a sample of users and records the number
+of SQL statements issued. Results are written as JSON so runs from two
+commits can be diffed (or compared directly with --compare).
+
+    python benchmarks/recommendation_benchmark.py --sizes small medium
+    python benchmarks/recommendation_benchmark.py --users 5000 --events 500 --output bench.json
+    python benchmarks/recommendation_benchmark.py --compare old.json --output new.json
+    python benchmarks/recommendation_benchmark.py --lsh-configs 16x4 32x2 8x8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {
+    'small': (1_000, 100),
+    'medium': (10_000, 1_000),
+    'large': (100_000, 10_000),
+}
+
+CATEGORIES = ['Technical', 'Cultural', 'Sports', 'Academic', 'Social', 'Career']
+LOCATIONS = ['Main Hall', 'Auditorium A', 'Tech Lab 1', 'Stadium', 'Art Gallery', 'Open Theatre']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def build_dataset(db, users, events, avg_registrations, skew, seed):
+    """Insert users, events and Zipf-distributed registrations with core executemany.
+
+    Core inserts bypass the ORM hooks, so the schedule columns are filled in
+    here and registration_count is recounted afterwards.
+    """
+    from models.user import User
+    from models.event import Event, event_registrations
+    from models.schema import recount_registrations
+
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+
+    db.session.execute(User.__table__.insert(), [{
+        'id': 1, 'username': 'bench-admin', 'email': 'admin@bench', 'password_hash': 'x', 'role': 'admin',
+        'created_at': now
+    }] + [{
+        'id': i + 2, 'username': f'student{i}', 'email': f'student{i}@bench', 'password_hash': 'x',
+        'role': 'student', 'created_at': now
+    } for i in range(users)])
+
+    event_rows = []
+    for i in range(events):
+        start_date = today + timedelta(days=rng.randint(-30, 90))
+        start_time = dtime(rng.randint(8, 18))
+        end_date = today + timedelta(days=91)
+        end_time = dtime(20)
+        starts_at = datetime.combine(start_date, start_time)
+        ends_at = datetime.combine(end_date, end_time)
+        event_rows.append({
+            'id': i + 1,
+            'title': f'Event {i}',
+            'description': f'Synthetic {CATEGORIES[i % len(CATEGORIES)]} event number {i}',
+            'start_date': start_date,
+            'start_time': start_time,
+            'end_date': end_date,
+            'end_time': end_time,
+            'starts_at': starts_at,
+            'ends_at': ends_at,
+            'status': Event.status_at(starts_at, ends_at, datetime.now()),
+            'location': LOCATIONS[rng.randrange(len(LOCATIONS))],
+            'category': CATEGORIES[rng.randrange(len(CATEGORIES))],
+            'max_capacity': rng.choice([50, 100, 200, 500]),
+            'creator_id': 1,
+            'created_at': now,
+            'updated_at': now,
+            'images': [],
+            'documents': []
+        })
+    db.session.execute(Event.__table__.insert(), event_rows)
+
+    # Event popularity follows a power law; so does the size of each user's history
+    weights = [1 / (rank + 1) ** skew for rank in range(events)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    event_ids = list(range(1, events + 1))
+    rng.shuffle(event_ids)
+
+    rows = []
+    for user_id in range(2, users + 2):
+        wanted = min(events, int(rng.paretovariate(1.5) * avg_registrations / 3))
+        chosen = set(rng.choices(event_ids, cum_weights=cumulative, k=wanted))
+        for event_id in chosen:
+            rows.append({
+                'user_id': user_id,
+                'event_id': event_id,
+                'registered_at': now - timedelta(hours=rng.randint(0, 24 * 30))
+            })
+    for start in range(0, len(rows), 50_000):
+        db.session.execute(event_registrations.insert(), rows[start:start + 50_000])
+    db.session.commit()
+    recount_registrations()
+    return len(rows)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def run_size(name, users, events, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        import config
+        config.Config.SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
+
+        from app import create_app
+        from models import db, co_registration_matrix, minhash_index
+        from models.user import User
+        from models.event_similarity import EventSimilarityIndex
+        from models.trending import TrendingIndex
+        from models.user_profile import UserPreferenceProfile
+        from models.reccomendation_engine import RecommendationEngine
+
+        app = create_app()
+        with app.test_request_context():
+            started = time.perf_counter()
+            registrations = build_dataset(db, users, events, args.avg_registrations, args.skew, args.seed)
+            EventSimilarityIndex.rebuild()
+            TrendingIndex.rebuild(app.config['TRENDING_HALF_LIFE_HOURS'])
+            UserPreferenceProfile.rebuild_all()
+            # Process-wide, refreshed by background tasks in the app: rebuild them
+            # from this size's database so the stages time reads only
+            co_registration_matrix.refresh()
+            minhash_index.refresh(app.config['RECOMMENDER_LSH_BANDS'], app.config['RECOMMENDER_LSH_ROWS'])
+            build_seconds = time.perf_counter() - started
+
+            counter = QueryCounter(db.engine)
+            rng = random.Random(args.seed)
+            sample = rng.sample(range(2, users + 2), min(args.samples, users))
+
+            def with_mode(mode, fn, similar_users='exact'):
+                def call(user):
+                    app.config['RECOMMENDER_COLLABORATIVE_MODE'] = mode
+                    app.config['RECOMMENDER_SIMILAR_USERS'] = similar_users
+                    return fn(user)
+                return call
+
+            stages = {
+                'get_user_recommendations': lambda user: RecommendationEngine.get_user_recommendations(user, 5),
+                'content_based': lambda user: RecommendationEngine._content_based_filtering(user, 10),
+                'collaborative_item': with_mode('item', lambda user: RecommendationEngine._collaborative_filtering(user, 5)),
+                'collaborative_user': with_mode('user', lambda user: RecommendationEngine._collaborative_filtering(user, 5)),
+                'collaborative_user_lsh': with_mode('user', lambda user: RecommendationEngine._collaborative_filtering(user, 5), 'lsh'),
+                'popularity_based': lambda user: RecommendationEngine._popularity_based_filtering(user, 5),
+                'trending': lambda user: RecommendationEngine.get_trending_events(10),
+            }
+
+            results = {}
+            sink = io.StringIO()
+            for stage, fn in stages.items():
+                timings = []
+                queries = []
+                for user_id in sample:
+                    db.session.expunge_all()
+                    user = db.session.get(User, user_id)
+                    user.registered_events  # the dashboard has this loaded already
+                    before = counter.count
+                    t0 = time.perf_counter()
+                    with contextlib.redirect_stdout(sink):
+                        fn(user)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                    queries.append(counter.count - before)
+                    sink.seek(0)
+                    sink.truncate()
+                app.config['RECOMMENDER_COLLABORATIVE_MODE'] = 'item'
+                app.config['RECOMMENDER_SIMILAR_USERS'] = 'exact'
+                results[stage] = {
+                    'p50_ms': round(percentile(timings, 50), 3),
+                    'p95_ms': round(percentile(timings, 95), 3),
+                    'p99_ms': round(percentile(timings, 99), 3),
+                    'mean_queries': round(sum(queries) / len(queries), 2),
+                    'max_queries': max(queries),
+                }
+            lsh = lsh_tradeoff(args.lsh_configs, sample, db, co_registration_matrix, minhash_index)
+            db.session.remove()
+            db.engine.dispose()
+
+    return {
+        'users': users,
+        'events': events,
+        'registrations': registrations,
+        'build_seconds': round(build_seconds, 2),
+        'samples': len(sample),
+        'stages': results,
+        'lsh': lsh,
+    }
+
+
+def lsh_tradeoff(configs, sample, db, co_registration_matrix, minhash_index, top=10):
+    """Recall of the top similar users and lookup latency for each bands x rows setting"""
+    from models.event import event_registrations
+    from sqlalchemy import select
+
+    user_events = {}
+    for user_id, event_id in db.session.execute(
+        select(event_registrations.c.user_id, event_registrations.c.event_id)
+    ).all():
+        user_events.setdefault(user_id, set()).add(event_id)
+    sample = [user_id for user_id in sample if user_events.get(user_id)]
+    if not sample:
+        return {}
+
+    matrix = co_registration_matrix.refresh()
+    exact = {}
+    timings = []
+    for user_id in sample:
+        t0 = time.perf_counter()
+        similar = matrix.similar_users(user_id, user_events[user_id])
+        timings.append((time.perf_counter() - t0) * 1000)
+        exact[user_id] = {matrix.user_ids[row] for row, _, _ in similar[:top]}
+    report = {'exact': {'p50_ms': round(percentile(timings, 50), 3), 'p95_ms': round(percentile(timings, 95), 3)}}
+
+    for config in configs:
+        bands, rows = (int(part) for part in config.split('x'))
+        t0 = time.perf_counter()
+        index = minhash_index.MinHashLSHIndex.build(bands, rows)
+        build_seconds = time.perf_counter() - t0
+        timings = []
+        found = wanted = 0
+        for user_id in sample:
+            t0 = time.perf_counter()
+            similar = index.similar_users(user_id, user_events[user_id])
+            timings.append((time.perf_counter() - t0) * 1000)
+            approx = {other_id for other_id, _, _ in similar[:top]}
+            found += len(approx & exact[user_id])
+            wanted += len(exact[user_id])
+        report[config] = {
+            'recall_at_%d' % top: round(found / wanted, 3) if wanted else 1.0,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'build_seconds': round(build_seconds, 2),
+        }
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(old, new, threshold):
+    """Print p95 deltas and return the stages that regressed by more than threshold"""
+    regressions = []
+    for size, result in new['datasets'].items():
+        previous = old.get('datasets', {}).get(size)
+        if not previous:
+            continue
+        for stage, metrics in result['stages'].items():
+            before = previous['stages'].get(stage)
+            if not before:
+                continue
+            ratio = metrics['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1.0
+            flag = ''
+            if ratio > 1 + threshold or metrics['mean_queries'] > before['mean_queries']:
+                regressions.append((size, stage))
+                flag = '  <-- regression'
+            print(f"{size:>8} {stage:<26} p95 {before['p95_ms']:>9.2f} -> {metrics['p95_ms']:>9.2f} ms"
+                  f"  queries {before['mean_queries']:>6} -> {metrics['mean_queries']:>6}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=['small'])
+    parser.add_argument('--users', type=int, help='Custom dataset user count (overrides --sizes)')
+    parser.add_argument('--events', type=int, default=1_000, help='Custom dataset event count')
+    parser.add_argument('--avg-registrations', type=float, default=6.0)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of event popularity')
+    parser.add_argument('--samples', type=int, default=100, help='Users timed per stage')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='Previous JSON result to diff against')
+    parser.add_argument('--lsh-configs', nargs='*', default=['16x4', '32x2', '8x8'],
+                        help='MinHash bands x rows settings to compare against the exact search')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p95 slowdown for --compare')
+    args = parser.parse_args()
+
+    datasets = {'custom': (args.users, args.events)} if args.users else {name: SIZES[name] for name in args.sizes}
+
+    report = {
+        'revision': git_revision(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'datasets': {},
+    }
+    for name, (users, events) in datasets.items():
+        print(f"== {name}: {users} users, {events} events")
+        report['datasets'][name] = result = run_size(name, users, events, args)
+        for stage, metrics in result['stages'].items():
+            print(f"   {stage:<26} p50 {metrics['p50_ms']:>9.2f}  p95 {metrics['p95_ms']:>9.2f}  "
+                  f"p99 {metrics['p99_ms']:>9.2f} ms  queries {metrics['mean_queries']}")
+        for config, metrics in result['lsh'].items():
+            recall = ''.join(f"  {key} {value}" for key, value in metrics.items() if key.startswith('recall'))
+            print(f"   similar users {config:<12} p50 {metrics['p50_ms']:>9.3f}  p95 {metrics['p95_ms']:>9.3f} ms{recall}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import os
+import time
+import click
+from models.event_similarity import EventSimilarityIndex
+from models import batch_recommender
+from models.trending import TrendingIndex
+from models.user_profile import UserPreferenceProfile
+from models.event_lifecycle import EventLifecycle
+from models.schema import recount_registrations, upgrade_schema, current_version
+from utils.query_plans import check_query_plans
+from utils.email_utils import drain_outbox
+from utils.notifications import deliver_notifications
+from extensions import reminder_scheduler
+from models.certificate import import_certificate_records
+from models.user import User
+from utils.certificate_generator import CertificateGenerator, run_certificate_jobs
+
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI"""
+
+    @app.cli.command('rebuild-similarity-index')
+    def rebuild_similarity_index():
+        """Recompute the event co-registration similarity index from scratch"""
+        rows = EventSimilarityIndex.rebuild()
+        click.echo(f"Similarity index rebuilt with {rows} rows")
+
+    @app.cli.command('precompute-recommendations')
+    @click.option('--top-k', default=10, show_default=True, help='Recommendations stored per student.')
+    @click.option('--workers', default=None, type=int, help='Pool size (defaults to the CPU count, 1 runs inline).')
+    @click.option('--chunk-size', default=200, show_default=True, help='Students scored per pool task.')
+    def precompute_recommendations(top_k, workers, chunk_size):
+        """Compute top-K recommendations for every student into user_recommendations"""
+        started = time.perf_counter()
+        students, rows = batch_recommender.precompute_all(
+            top_k=top_k,
+            workers=workers,
+            chunk_size=chunk_size,
+            neighbors_per_event=app.config.get('RECOMMENDER_NEIGHBORS_PER_EVENT', 20)
+        )
+        click.echo(f"Stored {rows} recommendations for {students} students "
+                   f"in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command('rebuild-trending')
+    def rebuild_trending():
+        """Recompute hourly registration buckets and trending scores from registered_at"""
+        events = TrendingIndex.rebuild(app.config.get('TRENDING_HALF_LIFE_HOURS', 24))
+        click.echo(f"Trending scores rebuilt for {events} events")
+
+    @app.cli.command('prune-trending')
+    def prune_trending():
+        """Drop trending scores and buckets of events that have already started"""
+        removed = TrendingIndex.prune_past_events()
+        click.echo(f"Removed {removed} trending scores")
+
+    @app.cli.command('rebuild-preference-profiles')
+    def rebuild_preference_profiles():
+        """Recompute every user's category/location preference profile"""
+        users = UserPreferenceProfile.rebuild_all()
+        click.echo(f"Rebuilt preference profiles for {users} users")
+
+    @app.cli.command('recount-registrations')
+    def recount_registrations_command():
+        """Resynchronize the denormalized events.registration_count column"""
+        events = recount_registrations()
+        click.echo(f"Recounted registrations for {events} events")
+
+    @app.cli.command('advance-event-status')
+    def advance_event_status():
+        """Move events whose start or end time has passed to ongoing/completed"""
+        started, completed = EventLifecycle.advance()
+        click.echo(f"{started} events started, {completed} events completed")
+
+    @app.cli.command('send-outbox')
+    def send_outbox():
+        """Deliver the queued emails that are due now"""
+        sent, failed = drain_outbox()
+        click.echo(f"Sent {sent} emails, {failed} failed (will be retried)")
+
+    @app.cli.command('send-notifications')
+    def send_notifications():
+        """Deliver (or resume) queued attendee notifications for event changes"""
+        runs = deliver_notifications()
+        click.echo(f"Completed {runs} notification runs")
+
+    @app.cli.command('send-reminders')
+    def send_reminders():
+        """Queue the pre-event reminders that are due now (skips ones already sent)"""
+        queued = reminder_scheduler.tick()
+        runs = deliver_notifications()
+        click.echo(f"Queued {queued} reminders, completed {runs} notification runs")
+
+    @app.cli.command('import-certificates')
+    @click.option('--path', default=None, help='Records file (defaults to static/certificates/certificate_records.json).')
+    def import_certificates(path):
+        """One-shot copy of the JSON certificate records into the certificates table"""
+        path = path or os.path.join(app.static_folder, 'certificates', 'certificate_records.json')
+        if not os.path.exists(path):
+            raise click.ClickException(f"No certificate records at {path}")
+        imported, skipped = import_certificate_records(path)
+        click.echo(f"Imported {imported} certificates, skipped {skipped} already stored")
+
+    @app.cli.command('generate-certificates')
+    @click.option('--event-id', required=True, type=int, help='Event whose attendees get certificates.')
+    @click.option('--workers', default=None, type=int, help='Pool size (defaults to the CPU count, 1 runs inline).')
+    def generate_certificates(event_id, workers):
+        """Render the missing certificates of an ended event now, without the background runner"""
+        admin = User.query.filter_by(role='admin').order_by(User.id).first()
+        if admin is None:
+            raise click.ClickException("No admin user to record as the requester")
+        started = time.perf_counter()
+        generator = CertificateGenerator(app)
+        lease = app.config.get('CERTIFICATE_JOB_LEASE', 600)
+        # Created leased, so the web workers' background runner leaves it alone
+        job = generator.create_job(admin, event_id=event_id, lease_seconds=lease)
+        job = generator.run_job(job, workers=workers, lease_seconds=lease, inline=workers == 1)
+        click.echo(f"Generated {job.done} certificates ({job.failed} failed) "
+                   f"in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command('run-certificate-jobs')
+    @click.option('--once', is_flag=True, help='Run the queued jobs and exit instead of polling.')
+    def run_certificate_jobs_command(once):
+        """Certificate worker: render queued bulk jobs (the Procfile's certificates process)"""
+        interval = app.config.get('CERTIFICATE_JOB_INTERVAL', 2)
+        while True:
+            finished = run_certificate_jobs()
+            if finished:
+                click.echo(f"Finished {finished} certificate jobs")
+            if once:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('upgrade-schema')
+    def upgrade_schema_command():
+        """Apply pending schema migrations"""
+        for version, description in upgrade_schema():
+            click.echo(f"Applied migration {version}: {description}")
+        click.echo(f"Schema is at version {current_version()}")
+
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, help='Print every statement with its plan.')
+    def check_query_plans_command(verbose):
+        """EXPLAIN the hot student/admin/recommender queries; fail on full table scans"""
+        failures = 0
+        for label, statement, plan, scans in check_query_plans():
+            if scans:
+                failures += 1
+                click.echo(f"FULL SCAN of {', '.join(scans)} in {label}:\n{statement}", err=True)
+            elif verbose:
+                click.echo(f"ok {label}:\n{statement}")
+            if scans or verbose:
+                for row in plan:
+                    click.echo(f"    {row[-1]}", err=bool(scans))
+        if failures:
+            raise click.ClickException(f"{failures} queries do a full table scan")
+        click.echo("No full table scans in the hot queries")
@@ -11,15 +11,77 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # Flask-Mail settings
-    MAIL_SERVER = "smtp.gmail.com"
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+    MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
+    MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "1") == "1"
     MAIL_USE_SSL = False
     MAIL_USERNAME = os.getenv("MAIL_USERNAME")
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = ("Eventify", os.getenv("MAIL_USERNAME"))
 
+    # Recommendation engine
+    RECOMMENDER_COLLABORATIVE_MODE = os.getenv("RECOMMENDER_COLLABORATIVE_MODE", "item")  # 'item' or 'user'
+    RECOMMENDER_NEIGHBORS_PER_EVENT = 20
+    RECOMMENDER_MATRIX_MAX_AGE = 60  # seconds between background rebuilds of the co-registration matrix
+    # 'user' mode neighbour search: 'exact' (matrix) or 'lsh' (MinHash, approximate).
+    # More rows per band is faster but finds fewer neighbours; more bands finds more.
+    RECOMMENDER_SIMILAR_USERS = os.getenv("RECOMMENDER_SIMILAR_USERS", "exact")
+    RECOMMENDER_LSH_BANDS = 16
+    RECOMMENDER_LSH_ROWS = 4
+    RECOMMENDER_LSH_MAX_AGE = 300  # seconds between background rebuilds of the LSH index
+    RECOMMENDATION_CACHE_SIZE = 2048  # cached (user, limit) lists per worker
+    RECOMMENDATION_CACHE_TTL = 300  # seconds
+    TRENDING_HALF_LIFE_HOURS = 24
+    TRENDING_WINDOW_HOURS = 168  # window for the "recent registrations" figure
+    TRENDING_PRUNE_INTERVAL = 3600  # seconds between drops of started events' scores and buckets
+    # Fraction of recommendation requests traced (0 disables tracing)
+    RECOMMENDER_TRACE_SAMPLE_RATE = float(os.getenv("RECOMMENDER_TRACE_SAMPLE_RATE", "0"))
+    RECOMMENDER_TRACE_SINK = None  # callable taking a trace dict; None logs traces instead
+
+    # Event listings and search results per page ("load more" fetches the next one)
+    EVENTS_PER_PAGE = 12
+    DASHBOARD_UPCOMING_EVENTS = 6
+    EVENT_STATUS_MAX_IDS = 200  # events per /api/events/status poll or /api/events/stream
+    # Live updates: dotted path of a cross-worker broker backend (unset keeps
+    # updates within one worker) and the idle keepalive interval of a stream.
+    EVENT_BROKER_BACKEND = os.getenv("EVENT_BROKER_BACKEND")
+    EVENT_STREAM_HEARTBEAT = 15  # seconds
+
+    # Periodic jobs on web worker threads (see utils/background.py)
+    BACKGROUND_TASKS_ENABLED = os.getenv("BACKGROUND_TASKS_ENABLED", "1") == "1"
+    EVENT_LIFECYCLE_INTERVAL = 60  # seconds between scheduled -> ongoing -> completed passes
+
+    # Email outbox: drained every MAIL_OUTBOX_INTERVAL seconds, one SMTP connection
+    # per batch; a failed message is retried after RETRY_BASE * 2^(attempt - 1) seconds
+    MAIL_OUTBOX_INTERVAL = 5
+    MAIL_OUTBOX_BATCH_SIZE = 100
+    MAIL_OUTBOX_RETRY_BASE = 30
+    MAIL_OUTBOX_MAX_ATTEMPTS = 8
+    MAIL_OUTBOX_LEASE = 300  # seconds a claimed batch is hidden from other workers
+
+    # Attendee notifications for event changes/cancellations (fan-out runs)
+    NOTIFICATION_INTERVAL = 5  # seconds between checks for unfinished runs
+    NOTIFICATION_CHUNK_SIZE = 500  # recipients committed per progress step
+    NOTIFICATION_SMTP_CONNECTIONS = 4  # parallel SMTP connections per chunk
+    NOTIFICATION_LEASE = 120  # seconds without progress before another worker resumes a run
+
+    # Pre-event reminders to registered students, sent this many minutes before the start
+    REMINDER_OFFSETS_MINUTES = [24 * 60, 60]
+    REMINDER_TICK = 30  # seconds between checks of the reminder heap
+    REMINDER_WINDOW = 3600  # seconds of upcoming reminders loaded per heap rebuild
+    REMINDER_GRACE = 900  # seconds a missed reminder may still be sent late
+
+    # Fail requests issuing more SQL statements than this (tests/local runs; unset disables).
+    # SQL_STATEMENT_BUDGETS maps an endpoint to its own limit.
+    SQL_STATEMENT_BUDGET = int(os.getenv("SQL_STATEMENT_BUDGET", "0")) or None
+    SQL_STATEMENT_BUDGETS = {}
+
     CERTIFICATE_UPLOAD_FOLDER = 'static/certificates'
     MAX_CERTIFICATE_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+    # Bulk certificate jobs: run by the `flask run-certificate-jobs` process (never the
+    # web workers), which renders PDFs across a process pool
+    CERTIFICATE_WORKERS = int(os.getenv("CERTIFICATE_WORKERS", "0")) or None  # pool size; None = CPU count
+    CERTIFICATE_JOB_INTERVAL = 2  # seconds between checks for queued jobs
+    CERTIFICATE_JOB_LEASE = 600  # seconds without progress before another worker resumes a job
     # Upload folder
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads', 'events')
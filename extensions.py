@@ -1,3 +1,15 @@
 from flask_mail import Mail
+from utils.recommendation_cache import RecommendationCache
+from utils.tracing import Tracer
+from utils.query_budget import QueryBudget
+from utils.event_broker import EventBroker
+from utils.background import BackgroundTasks
+from utils.reminders import ReminderScheduler
 
 mail = Mail()
+recommendation_cache = RecommendationCache()
+tracer = Tracer()
+query_budget = QueryBudget()
+event_broker = EventBroker()
+background = BackgroundTasks()
+reminder_scheduler = ReminderScheduler()
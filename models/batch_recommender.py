@@ -0,0 +1,209 @@
+from collections import Counter, defaultdict, namedtuple
+from datetime import date, datetime
+from multiprocessing import Pool
+import math
+
+from sqlalchemy import select
+
+from models import db
+from models.event import Event, event_registrations
+from models.user import User
+from models.event_similarity import EventSimilarityIndex
+from models.user_recommendation import UserRecommendation
+from models.reccomendation_engine import RecommendationEngine
+
+EventRow = namedtuple('EventRow', 'id category location start_date max_capacity registration_count')
+
+
+class RecommendationSnapshot:
+    """Plain-data copy of everything the batch scorer needs.
+
+    Loaded once in the parent process with a handful of queries and handed
+    to every pool worker, so scoring a user never touches the database.
+    """
+
+    def __init__(self, today, upcoming, event_meta, user_events, neighbors, counts):
+        self.today = today
+        self.upcoming = upcoming              # event id -> EventRow, upcoming events only
+        self.event_meta = event_meta          # event id -> (category, location), all events
+        self.user_events = user_events        # user id -> tuple of registered event ids
+        self.neighbors = neighbors            # event id -> [(neighbor id, co_count)], best first
+        self.counts = counts                  # event id -> registration count
+        self.by_start = sorted(upcoming.values(), key=lambda e: (e.start_date, e.id))
+        self.by_popularity = sorted(upcoming.values(), key=lambda e: (-e.registration_count, e.id))
+
+    @classmethod
+    def load(cls, neighbors_per_event=20):
+        today = date.today()
+
+        counts = {}
+        event_meta = {}
+        upcoming = {}
+        for row in db.session.execute(select(
+            Event.id, Event.category, Event.location, Event.start_date, Event.max_capacity,
+            Event.registration_count
+        )).all():
+            counts[row.id] = row.registration_count
+            event_meta[row.id] = (row.category, row.location)
+            if row.start_date >= today:
+                upcoming[row.id] = EventRow(
+                    row.id, row.category, row.location, row.start_date,
+                    row.max_capacity, row.registration_count
+                )
+
+        user_events = defaultdict(list)
+        for user_id, event_id in db.session.execute(
+            select(event_registrations.c.user_id, event_registrations.c.event_id)
+        ).all():
+            user_events[user_id].append(event_id)
+
+        neighbors = defaultdict(list)
+        for event_id, neighbor_id, co_count in EventSimilarityIndex.neighbors(
+            list(event_meta), neighbors_per_event
+        ):
+            neighbors[event_id].append((neighbor_id, co_count))
+
+        return cls(
+            today, upcoming, event_meta,
+            {user_id: tuple(ids) for user_id, ids in user_events.items()},
+            dict(neighbors), counts
+        )
+
+
+def score_user(snapshot, user_id, limit):
+    """Mirror of RecommendationEngine.get_user_recommendations over a snapshot.
+
+    Returns (event_id, score, reason) tuples. Collaborative scores always
+    come from the item-item index, whatever RECOMMENDER_COLLABORATIVE_MODE
+    the live pipeline uses.
+    """
+    user_event_ids = set(snapshot.user_events.get(user_id, ()))
+    if not user_event_ids:
+        return _fallback(snapshot, user_event_ids, limit)
+
+    today = snapshot.today
+    candidates = [e for e in snapshot.upcoming.values() if e.id not in user_event_ids]
+    all_recommendations = []
+
+    # 1. Content-based (50% weight)
+    metas = [snapshot.event_meta[event_id] for event_id in user_event_ids if event_id in snapshot.event_meta]
+    category_counts = Counter(category for category, _ in metas)
+    location_counts = Counter(location for _, location in metas)
+    content = []
+    for event in candidates:
+        score, reasons = RecommendationEngine._content_score(
+            event.category, event.start_date, event.max_capacity, event.registration_count,
+            category_counts.get(event.category, 0), location_counts.get(event.location, 0),
+            len(metas), today
+        )
+        if score > 0.1:
+            content.append((event.id, min(score, 1.0), RecommendationEngine._content_reason(reasons)))
+    content.sort(key=lambda x: x[1], reverse=True)
+    all_recommendations.extend((event_id, score * 0.5, reason) for event_id, score, reason in content[:limit * 2])
+
+    # 2. Item-based collaborative (25% weight)
+    item_scores = defaultdict(float)
+    for event_id in user_event_ids:
+        for neighbor_id, co_count in snapshot.neighbors.get(event_id, ()):
+            if neighbor_id in user_event_ids or neighbor_id not in snapshot.upcoming:
+                continue
+            norm = math.sqrt(snapshot.counts.get(event_id, 0) * snapshot.counts.get(neighbor_id, 0))
+            if norm:
+                item_scores[neighbor_id] += co_count / norm
+    collab = sorted(item_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+    all_recommendations.extend(
+        (event_id, min(score, 1.0) * 0.25, "Students who joined your events also registered for this event")
+        for event_id, score in collab
+    )
+
+    # 3. Popularity (25% weight)
+    popular = []
+    for event in snapshot.by_popularity:
+        if event.id in user_event_ids:
+            continue
+        score = RecommendationEngine._popularity_score(
+            event.registration_count, event.max_capacity, event.start_date, today
+        )
+        popular.append((event.id, min(score, 1.0), f"Popular event with {event.registration_count} registrations"))
+        if len(popular) >= limit * 2:
+            break
+    popular.sort(key=lambda x: x[1], reverse=True)
+    all_recommendations.extend((event_id, score * 0.25, reason) for event_id, score, reason in popular[:limit])
+
+    # Merge, keeping each event's best score
+    seen = set()
+    unique = []
+    for rec in sorted(all_recommendations, key=lambda x: x[1], reverse=True):
+        if rec[0] not in seen:
+            seen.add(rec[0])
+            unique.append(rec)
+
+    if len(unique) < limit:
+        unique.extend(_fallback(snapshot, user_event_ids | seen, limit - len(unique)))
+
+    return unique[:limit]
+
+
+def _fallback(snapshot, exclude_ids, limit):
+    picked = []
+    for event in snapshot.by_start:
+        if len(picked) >= limit:
+            break
+        if event.id not in exclude_ids:
+            picked.append((event.id, 0.1, 'Upcoming event you might find interesting'))
+    return picked
+
+
+# Per-process state for pool workers
+_worker_snapshot = None
+
+
+def _init_worker(snapshot):
+    global _worker_snapshot
+    _worker_snapshot = snapshot
+
+
+def _score_chunk(args):
+    user_ids, top_k = args
+    rows = []
+    for user_id in user_ids:
+        for rank, (event_id, score, reason) in enumerate(score_user(_worker_snapshot, user_id, top_k)):
+            rows.append((user_id, rank, event_id, score, reason))
+    return rows
+
+
+def precompute_all(top_k=10, workers=None, chunk_size=200, neighbors_per_event=20):
+    """Score every student and replace the user_recommendations table in one transaction"""
+    snapshot = RecommendationSnapshot.load(neighbors_per_event)
+    student_ids = [user_id for (user_id,) in db.session.execute(
+        select(User.id).where(User.role == 'student')
+    ).all()]
+    chunks = [
+        (student_ids[i:i + chunk_size], top_k)
+        for i in range(0, len(student_ids), chunk_size)
+    ]
+
+    rows = []
+    if workers == 1:
+        _init_worker(snapshot)
+        for chunk in chunks:
+            rows.extend(_score_chunk(chunk))
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(snapshot,)) as pool:
+            for chunk_rows in pool.imap_unordered(_score_chunk, chunks):
+                rows.extend(chunk_rows)
+
+    computed_at = datetime.utcnow()
+    db.session.execute(UserRecommendation.__table__.delete())
+    if rows:
+        db.session.execute(UserRecommendation.__table__.insert(), [{
+            'user_id': user_id,
+            'rank': rank,
+            'event_id': event_id,
+            'score': score,
+            'reason': reason,
+            'computed_at': computed_at
+        } for user_id, rank, event_id, score, reason in rows])
+    db.session.commit()
+
+    return len(student_ids), len(rows)
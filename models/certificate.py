@@ -0,0 +1,169 @@
+from datetime import datetime, date, timedelta
+import json
+from sqlalchemy import select, update, or_
+from . import db
+
+
+class Certificate(db.Model):
+    """A generated participation certificate; the id is the public certificate ID"""
+    __tablename__ = 'certificates'
+
+    id = db.Column(db.String(40), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event_id = db.Column(db.Integer, nullable=False)
+    # Copied at generation time, so a certificate still verifies after its event is deleted
+    user_name = db.Column(db.String(80), nullable=False)
+    user_email = db.Column(db.String(120))
+    event_title = db.Column(db.String(200), nullable=False)
+    event_category = db.Column(db.String(100))
+    event_start_date = db.Column(db.Date)
+    event_end_date = db.Column(db.Date)
+    event_location = db.Column(db.String(200))
+    filename = db.Column(db.String(255), nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    download_count = db.Column(db.Integer, nullable=False, default=0)
+    last_downloaded_at = db.Column(db.DateTime)
+    is_valid = db.Column(db.Boolean, nullable=False, default=True)
+
+    __table_args__ = (
+        # One certificate per participant and event, enforced across workers
+        db.UniqueConstraint('user_id', 'event_id', name='uq_certificates_user_event'),
+    )
+
+    def to_record(self):
+        """The record in the shape of the former certificate_records.json entries"""
+        return {
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'user_email': self.user_email,
+            'event_id': self.event_id,
+            'event_title': self.event_title,
+            'event_category': self.event_category,
+            'event_start_date': self.event_start_date.isoformat() if self.event_start_date else None,
+            'event_end_date': self.event_end_date.isoformat() if self.event_end_date else None,
+            'event_location': self.event_location,
+            'generated_at': self.generated_at.isoformat(),
+            'download_count': self.download_count,
+            'last_downloaded': self.last_downloaded_at.isoformat() if self.last_downloaded_at else None,
+            'filename': self.filename,
+            'is_valid': self.is_valid
+        }
+
+
+class CertificateJob(db.Model):
+    """Bulk certificate generation for an event's attendees or one user's eligible events"""
+    __tablename__ = 'certificate_jobs'
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, index=True)  # set for an event job
+    user_id = db.Column(db.Integer, index=True)   # set for a user job
+    requested_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    done = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    lease_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_certificate_jobs_status_lease', 'status', 'lease_until'),
+    )
+
+    @property
+    def finished(self):
+        return self.status in (CertificateJob.COMPLETED, CertificateJob.FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'error': self.error
+        }
+
+    @staticmethod
+    def latest(event_id=None, user_id=None):
+        query = CertificateJob.query
+        if event_id is not None:
+            query = query.filter_by(event_id=event_id)
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        return query.order_by(CertificateJob.id.desc()).first()
+
+    @staticmethod
+    def claim(lease_seconds, now=None):
+        """Lease the oldest unfinished job nobody is working on (commits); None when idle"""
+        now = now or datetime.utcnow()
+        candidates = db.session.execute(
+            select(CertificateJob.id).where(
+                CertificateJob.status.in_((CertificateJob.PENDING, CertificateJob.RUNNING)),
+                or_(CertificateJob.lease_until.is_(None), CertificateJob.lease_until < now)
+            ).order_by(CertificateJob.id).limit(5)
+        ).scalars().all()
+        for job_id in candidates:
+            if db.session.execute(
+                update(CertificateJob).where(
+                    CertificateJob.id == job_id,
+                    or_(CertificateJob.lease_until.is_(None), CertificateJob.lease_until < now)
+                ).values(
+                    status=CertificateJob.RUNNING,
+                    lease_until=now + timedelta(seconds=lease_seconds)
+                ).execution_options(synchronize_session=False)
+            ).rowcount:
+                db.session.commit()
+                return db.session.get(CertificateJob, job_id)
+        db.session.commit()
+        return None
+
+
+def import_certificate_records(path):
+    """Copy certificate_records.json into the certificates table.
+
+    Records whose certificate ID, or whose (user, event) pair, is already
+    stored are skipped, so the import can be re-run. Returns (imported, skipped).
+    """
+    with open(path) as f:
+        records = json.load(f)
+
+    existing_ids = set(db.session.execute(select(Certificate.id)).scalars())
+    existing_pairs = set(db.session.execute(select(Certificate.user_id, Certificate.event_id)).tuples())
+    rows = []
+    for cert_id, data in records.items():
+        pair = (data['user_id'], data['event_id'])
+        if cert_id in existing_ids or pair in existing_pairs:
+            continue
+        existing_pairs.add(pair)
+        rows.append({
+            'id': cert_id,
+            'user_id': data['user_id'],
+            'event_id': data['event_id'],
+            'user_name': data.get('user_name') or '',
+            'user_email': data.get('user_email'),
+            'event_title': data.get('event_title') or '',
+            'event_category': data.get('event_category'),
+            'event_start_date': _parse_date(data.get('event_start_date')),
+            'event_end_date': _parse_date(data.get('event_end_date')),
+            'event_location': data.get('event_location'),
+            'filename': data.get('filename') or f"{cert_id}.pdf",
+            'generated_at': datetime.fromisoformat(data['generated_at']) if data.get('generated_at') else datetime.now(),
+            'download_count': data.get('download_count', 0),
+            'last_downloaded_at': datetime.fromisoformat(data['last_downloaded']) if data.get('last_downloaded') else None,
+            'is_valid': data.get('is_valid', True)
+        })
+    if rows:
+        db.session.execute(Certificate.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows), len(records) - len(rows)
+
+
+def _parse_date(value):
+    return date.fromisoformat(value[:10]) if value else None
@@ -0,0 +1,134 @@
+from array import array
+from collections import Counter
+import threading
+import time
+
+from sqlalchemy import select
+
+from models import db
+from models.event import event_registrations
+
+
+class CoRegistrationMatrix:
+    """Compressed sparse user x event matrix built from event_registrations.
+
+    Rows (users) are stored CSR-style: ``indptr[r]:indptr[r + 1]`` slices
+    ``indices`` to give the event ids of row ``r``. The transpose is kept the
+    same way so the users of an event are a single array slice.
+    """
+
+    def __init__(self, user_ids, indptr, indices, event_ptr, event_rows):
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.event_ptr = event_ptr
+        self.event_rows = event_rows
+        self.row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        """Build the matrix from a single scan of event_registrations"""
+        rows = db.session.execute(
+            select(event_registrations.c.user_id, event_registrations.c.event_id)
+            .order_by(event_registrations.c.user_id, event_registrations.c.event_id)
+        ).all()
+
+        user_ids = array('l')
+        indptr = array('l', [0])
+        indices = array('l')
+        by_event = {}
+
+        last_user = None
+        for user_id, event_id in rows:
+            if user_id != last_user:
+                if last_user is not None:
+                    indptr.append(len(indices))
+                user_ids.append(user_id)
+                last_user = user_id
+            by_event.setdefault(event_id, []).append(len(user_ids) - 1)
+            indices.append(event_id)
+        if last_user is not None:
+            indptr.append(len(indices))
+
+        event_ptr = {}
+        event_rows = array('l')
+        for event_id, user_rows in by_event.items():
+            start = len(event_rows)
+            event_rows.extend(user_rows)
+            event_ptr[event_id] = (start, len(event_rows))
+
+        return cls(user_ids, indptr, indices, event_ptr, event_rows)
+
+    def row_events(self, row):
+        """Event ids registered by the user stored at ``row``"""
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def similar_users(self, user_id, event_ids, min_similarity=0.1):
+        """Jaccard-similar users for a user with the given registered events.
+
+        The target's own event set is passed in so that registrations made
+        since the last rebuild are taken into account. Intersections come from
+        counting the column slices of those events, so the cost depends on
+        how popular the user's events are rather than on the number of users.
+        Returns ``(row, similarity, intersection)`` tuples, best first.
+        """
+        own_row = self.row_of.get(user_id)
+        overlap = Counter()
+        for event_id in event_ids:
+            span = self.event_ptr.get(event_id)
+            if span is not None:
+                overlap.update(self.event_rows[span[0]:span[1]])
+        overlap.pop(own_row, None)
+
+        size = len(event_ids)
+        indptr = self.indptr
+        similar = []
+        for row, intersection in overlap.items():
+            union = size + (indptr[row + 1] - indptr[row]) - intersection
+            similarity = intersection / union
+            if similarity > min_similarity:
+                similar.append((row, similarity, intersection))
+
+        similar.sort(key=lambda x: x[1], reverse=True)
+        return similar
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def get_matrix():
+    """Return the process-wide matrix.
+
+    Requests only read it: refresh() rebuilds it on a background task every
+    RECOMMENDER_MATRIX_MAX_AGE seconds and swaps the new one in. A cold
+    process (or one after invalidate()) builds it once, under the lock.
+    """
+    matrix = _matrix
+    if matrix is not None:
+        return matrix
+    with _lock:
+        if _matrix is None:
+            return _refresh_locked()
+        return _matrix
+
+
+def refresh():
+    """Rebuild the matrix and swap it in; readers keep the old one until then"""
+    with _lock:
+        return _refresh_locked()
+
+
+def _refresh_locked():
+    global _matrix
+    # One assignment: a concurrent reader sees the old matrix or the new one, never a partial build
+    _matrix = CoRegistrationMatrix.build()
+    return _matrix
+
+
+def invalidate():
+    """Force the next get_matrix() call to rebuild"""
+    global _matrix
+    with _lock:
+        _matrix = None
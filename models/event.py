@@ -1,5 +1,6 @@
 from datetime import datetime
 from . import db
+from sqlalchemy import event as orm_event
 from sqlalchemy.dialects.sqlite import JSON
 from sqlalchemy.ext.mutable import MutableList
 
@@ -7,12 +8,19 @@ from sqlalchemy.ext.mutable import MutableList
 event_registrations = db.Table('event_registrations',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
     db.Column('event_id', db.Integer, db.ForeignKey('events.id'), primary_key=True),
-    db.Column('registered_at', db.DateTime, default=datetime.utcnow)
+    db.Column('registered_at', db.DateTime, default=datetime.utcnow),
+    # The primary key only serves lookups by user_id; attendee lists and counts go by event
+    db.Index('ix_event_registrations_event_user', 'event_id', 'user_id')
 )
 
 class Event(db.Model):
     __tablename__ = 'events'
     
+    # Lifecycle states of the status column
+    SCHEDULED = 'scheduled'
+    ONGOING = 'ongoing'
+    COMPLETED = 'completed'
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -20,9 +28,17 @@ class Event(db.Model):
     start_time = db.Column(db.Time, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
+    # Combined from the date/time columns on every write (see sync_schedule) so
+    # time-window queries are index range scans instead of per-row combines
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    # Set on write, then advanced by EventLifecycle.advance as time passes
+    status = db.Column(db.String(20), nullable=False, default=SCHEDULED, server_default=SCHEDULED)
     location = db.Column(db.String(200), nullable=False)
     category = db.Column(db.String(100), nullable=False)
     max_capacity = db.Column(db.Integer, default=100)
+    # Maintained by the registration transaction; see StudentViewModel.register_for_event
+    registration_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -34,9 +50,29 @@ class Event(db.Model):
     creator = db.relationship('User', foreign_keys=[creator_id], back_populates='created_events')
     registered_users = db.relationship('User', secondary=event_registrations, back_populates='registered_events')
     
-    @property
-    def registration_count(self):
-        return len(self.registered_users)
+    __table_args__ = (
+        db.Index('ix_events_start_date_start_time', 'start_date', 'start_time'),
+        db.Index('ix_events_category_start_date', 'category', 'start_date', 'start_time'),
+        db.Index('ix_events_creator_start_date', 'creator_id', 'start_date'),
+        db.Index('ix_events_starts_at', 'starts_at'),
+        # Serves both lifecycle steps and the ongoing list; ends_at rides along
+        # so the end-time check needs no table lookup
+        db.Index('ix_events_status_starts_at', 'status', 'starts_at', 'ends_at'),
+    )
+    
+    @staticmethod
+    def status_at(starts_at, ends_at, now):
+        if now < starts_at:
+            return Event.SCHEDULED
+        if now <= ends_at:
+            return Event.ONGOING
+        return Event.COMPLETED
+    
+    def sync_schedule(self, now=None):
+        """Recompute starts_at, ends_at and status from the date/time columns"""
+        self.starts_at = datetime.combine(self.start_date, self.start_time)
+        self.ends_at = datetime.combine(self.end_date, self.end_time)
+        self.status = Event.status_at(self.starts_at, self.ends_at, now or datetime.now())
     
     @property
     def is_full(self):
@@ -44,6 +80,21 @@ class Event(db.Model):
     
     @property
     def is_past(self):
-        from datetime import datetime
-        event_datetime = datetime.combine(self.start_date, self.start_time)
-        return event_datetime < datetime.now()
\ No newline at end of file
+        """True once the event has started"""
+        return (self.starts_at or datetime.combine(self.start_date, self.start_time)) < datetime.now()
+    
+    @property
+    def is_ongoing(self):
+        now = datetime.now()
+        return (self.starts_at or datetime.combine(self.start_date, self.start_time)) <= now <= \
+            (self.ends_at or datetime.combine(self.end_date, self.end_time))
+    
+    @property
+    def has_ended(self):
+        return (self.ends_at or datetime.combine(self.end_date, self.end_time)) < datetime.now()
+
+
+@orm_event.listens_for(Event, 'before_insert')
+@orm_event.listens_for(Event, 'before_update')
+def _sync_schedule(mapper, connection, target):
+    target.sync_schedule()
@@ -0,0 +1,33 @@
+from datetime import datetime
+from sqlalchemy import update
+from . import db
+from .event import Event
+
+
+class EventLifecycle:
+    """Moves events along scheduled -> ongoing -> completed as time passes.
+
+    Both steps are conditional UPDATEs on the (status, starts_at, ends_at)
+    index, so a pass reads only started events that are not yet completed.
+    Running it from several workers at once is harmless.
+    """
+
+    @staticmethod
+    def advance(now=None):
+        """Apply due transitions; returns (started, completed) row counts"""
+        now = now or datetime.now()
+        completed = db.session.execute(
+            update(Event).where(
+                Event.status.in_((Event.SCHEDULED, Event.ONGOING)),
+                Event.starts_at <= now,
+                Event.ends_at < now
+            ).values(status=Event.COMPLETED).execution_options(synchronize_session=False)
+        ).rowcount
+        started = db.session.execute(
+            update(Event).where(
+                Event.status == Event.SCHEDULED,
+                Event.starts_at <= now
+            ).values(status=Event.ONGOING).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return started, completed
@@ -0,0 +1,136 @@
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import text, inspect, or_, Integer, Float, String
+from utils.pagination import Keyset
+from . import db
+from .event import Event
+
+# Column weights for bm25(): title matches count most, then location, then description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+LOCATION_WEIGHT = 3.0
+
+# Control characters FTS5 wraps around matched terms; swapped for <mark> after escaping
+_MARK_OPEN = '\x02'
+_MARK_CLOSE = '\x03'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Chronological listing order; id breaks ties so the key is unique for keyset pagination
+EVENT_KEYSET = Keyset(Event.start_date, Event.start_time, Event.id)
+EVENT_KEYSET_DESC = Keyset(Event.start_date, Event.start_time, Event.id, descending=True)
+
+
+def event_key(event):
+    return (event.start_date, event.start_time, event.id)
+
+
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        title, description, location,
+        content='events', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Only the indexed columns fire the update trigger, so registration
+    # counter updates never touch the full-text index
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, description, location ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO events_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    "INSERT INTO events_fts(events_fts) VALUES ('rebuild')",
+]
+
+
+def create_fts_index(conn):
+    """Create the FTS5 index and its sync triggers (SQLite only)"""
+    if conn.dialect.name != 'sqlite':
+        return False
+    for statement in CREATE_FTS:
+        conn.execute(text(statement))
+    return True
+
+
+def match_expression(search_query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    tokens = _TOKEN.findall(search_query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def highlight(snippet):
+    """Escape an FTS5 snippet and mark the matched terms"""
+    return Markup(str(escape(snippet)).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+class EventSearch:
+    """BM25-ranked event search over the events_fts index.
+
+    The text query is matched in FTS5; category, date, location and time
+    filters stay ordinary predicates on events and are applied in the same
+    statement. Without a text query the filters alone are used, paged in
+    ``keyset`` order; text matches are paged by (bm25 rank, id).
+    """
+
+    _available = None
+
+    @staticmethod
+    def available():
+        if EventSearch._available is None:
+            EventSearch._available = inspect(db.engine).has_table('events_fts')
+        return EventSearch._available
+
+    @staticmethod
+    def search(search_query=None, filters=(), keyset=EVENT_KEYSET, cursor=None, per_page=None, options=()):
+        """Page of matching events as (event, snippet) pairs, best match first when searching text"""
+        match = match_expression(search_query)
+
+        if match and EventSearch.available():
+            fts = text(
+                "SELECT rowid AS event_id, "
+                "bm25(events_fts, :title_weight, :description_weight, :location_weight) AS rank, "
+                "snippet(events_fts, -1, :open, :close, '…', 16) AS snippet "
+                "FROM events_fts WHERE events_fts MATCH :match"
+            ).bindparams(
+                title_weight=TITLE_WEIGHT,
+                description_weight=DESCRIPTION_WEIGHT,
+                location_weight=LOCATION_WEIGHT,
+                open=_MARK_OPEN,
+                close=_MARK_CLOSE,
+                match=match
+            ).columns(event_id=Integer, rank=Float, snippet=String).subquery('fts')
+
+            query = db.session.query(Event, fts.c.snippet, fts.c.rank).join(
+                fts, fts.c.event_id == Event.id
+            ).filter(*filters).options(*options)
+            page = Keyset(fts.c.rank, Event.id).page(
+                query, lambda row: (row.rank, row.Event.id), cursor, per_page
+            )
+            return page.map(lambda row: (row.Event, highlight(row.snippet)))
+
+        query = Event.query.filter(*filters).options(*options)
+        if search_query:
+            # No FTS5 in this SQLite build (or no indexable words): substring match
+            pattern = f'%{search_query}%'
+            query = query.filter(or_(
+                Event.title.ilike(pattern),
+                Event.description.ilike(pattern),
+                Event.location.ilike(pattern)
+            ))
+        return keyset.page(query, event_key, cursor, per_page).map(lambda event: (event, None))
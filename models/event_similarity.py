@@ -0,0 +1,129 @@
+from sqlalchemy import select, func, or_, and_, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import db
+from .event import Event, event_registrations
+
+
+class EventSimilarity(db.Model):
+    """Co-registration count between two events (stored in both directions)"""
+    __tablename__ = 'event_similarities'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    co_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_event_similarities_event_co_count', 'event_id', 'co_count'),
+    )
+
+
+class EventSimilarityIndex:
+    """Incrementally maintained event-to-event co-registration index.
+
+    Every pair of events that share at least one registrant has a row per
+    direction holding the number of shared students. Registrations and
+    unregistrations adjust the rows of the affected event with one statement
+    each, so the index never needs a full recomputation on the request path.
+    """
+
+    @staticmethod
+    def record_registration(user_id, event_id):
+        """Add one co-registration between event_id and each of the user's other events"""
+        others = select(
+            literal(event_id), event_registrations.c.event_id, literal(1)
+        ).where(
+            event_registrations.c.user_id == user_id,
+            event_registrations.c.event_id != event_id
+        )
+        reverse = select(
+            event_registrations.c.event_id, literal(event_id), literal(1)
+        ).where(
+            event_registrations.c.user_id == user_id,
+            event_registrations.c.event_id != event_id
+        )
+        columns = ['event_id', 'neighbor_id', 'co_count']
+        for source in (others, reverse):
+            stmt = sqlite_insert(EventSimilarity.__table__).from_select(columns, source)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['event_id', 'neighbor_id'],
+                set_={'co_count': EventSimilarity.__table__.c.co_count + 1}
+            )
+            db.session.execute(stmt)
+
+    @staticmethod
+    def record_unregistration(user_id, event_id):
+        """Remove one co-registration between event_id and each of the user's other events"""
+        user_events = select(event_registrations.c.event_id).where(
+            event_registrations.c.user_id == user_id,
+            event_registrations.c.event_id != event_id
+        )
+        pair_filter = or_(
+            and_(EventSimilarity.event_id == event_id, EventSimilarity.neighbor_id.in_(user_events)),
+            and_(EventSimilarity.neighbor_id == event_id, EventSimilarity.event_id.in_(user_events))
+        )
+        db.session.execute(
+            EventSimilarity.__table__.update().where(pair_filter).values(
+                co_count=EventSimilarity.__table__.c.co_count - 1
+            )
+        )
+        db.session.execute(
+            EventSimilarity.__table__.delete().where(
+                or_(EventSimilarity.event_id == event_id, EventSimilarity.neighbor_id == event_id),
+                EventSimilarity.co_count <= 0
+            )
+        )
+
+    @staticmethod
+    def remove_event(event_id):
+        """Drop all index rows that reference a deleted event"""
+        db.session.execute(
+            EventSimilarity.__table__.delete().where(
+                or_(EventSimilarity.event_id == event_id, EventSimilarity.neighbor_id == event_id)
+            )
+        )
+
+    @staticmethod
+    def neighbors(event_ids, per_event=20):
+        """Top neighbours of each event as (event_id, neighbor_id, co_count) tuples"""
+        if not event_ids:
+            return []
+
+        rank = func.row_number().over(
+            partition_by=EventSimilarity.event_id,
+            order_by=EventSimilarity.co_count.desc()
+        ).label('rank')
+        ranked = select(
+            EventSimilarity.event_id, EventSimilarity.neighbor_id, EventSimilarity.co_count, rank
+        ).where(EventSimilarity.event_id.in_(list(event_ids))).subquery()
+
+        return db.session.execute(
+            select(ranked.c.event_id, ranked.c.neighbor_id, ranked.c.co_count)
+            .where(ranked.c.rank <= per_event)
+        ).all()
+
+    @staticmethod
+    def registration_counts(event_ids):
+        """Number of registrations per event id"""
+        if not event_ids:
+            return {}
+        return dict(db.session.execute(
+            select(Event.id, Event.registration_count).where(Event.id.in_(list(event_ids)))
+        ).all())
+
+    @staticmethod
+    def rebuild():
+        """Recompute the whole index from event_registrations"""
+        a = event_registrations.alias('a')
+        b = event_registrations.alias('b')
+        pairs = select(a.c.event_id, b.c.event_id, func.count()).select_from(
+            a.join(b, and_(a.c.user_id == b.c.user_id, a.c.event_id != b.c.event_id))
+        ).group_by(a.c.event_id, b.c.event_id)
+
+        db.session.execute(EventSimilarity.__table__.delete())
+        db.session.execute(
+            EventSimilarity.__table__.insert().from_select(
+                ['event_id', 'neighbor_id', 'co_count'], pairs
+            )
+        )
+        db.session.commit()
+        return db.session.query(func.count(EventSimilarity.event_id)).scalar()
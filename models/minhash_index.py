@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+
+from sqlalchemy import select
+
+from models import db
+from models.event import event_registrations
+
+_PRIME = (1 << 61) - 1
+
+
+class MinHashLSHIndex:
+    """MinHash signatures of users' registered-event sets in LSH band buckets.
+
+    Each signature is ``bands * rows`` minimum hash values. Users whose
+    signatures agree on every row of at least one band land in the same
+    bucket and become candidates; the candidates are then verified with the
+    exact Jaccard similarity. More rows per band raise precision and speed,
+    more bands raise recall.
+    """
+
+    def __init__(self, bands=16, rows=4, seed=1):
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self._coefficients = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(bands * rows)
+        ]
+        self._event_hashes = {}
+        self.user_events = {}
+        self.signatures = {}
+        self.buckets = [dict() for _ in range(bands)]
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, bands=16, rows=4):
+        """Index every user from a single scan of event_registrations"""
+        index = cls(bands, rows)
+        user_events = {}
+        for user_id, event_id in db.session.execute(
+            select(event_registrations.c.user_id, event_registrations.c.event_id)
+        ).all():
+            user_events.setdefault(user_id, set()).add(event_id)
+        for user_id, event_ids in user_events.items():
+            index._insert(user_id, event_ids)
+        return index
+
+    def _event_hash(self, event_id):
+        hashes = self._event_hashes.get(event_id)
+        if hashes is None:
+            hashes = tuple((a * event_id + b) % _PRIME for a, b in self._coefficients)
+            self._event_hashes[event_id] = hashes
+        return hashes
+
+    def signature(self, event_ids):
+        return tuple(map(min, zip(*(self._event_hash(event_id) for event_id in event_ids))))
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows] for band in range(self.bands)]
+
+    def _insert(self, user_id, event_ids):
+        self.user_events[user_id] = event_ids
+        if not event_ids:
+            return
+        signature = self.signature(event_ids)
+        self.signatures[user_id] = signature
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(user_id)
+
+    def _remove(self, user_id):
+        signature = self.signatures.pop(user_id, None)
+        self.user_events.pop(user_id, None)
+        if signature is None:
+            return
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(user_id)
+                if not members:
+                    del bucket[key]
+
+    def update_user(self, user_id, event_ids):
+        """Re-sign a user after their registrations changed"""
+        with self._lock:
+            self._remove(user_id)
+            self._insert(user_id, set(event_ids))
+
+    def record_registration(self, user_id, event_id):
+        self.update_user(user_id, self.user_events.get(user_id, set()) | {event_id})
+
+    def record_unregistration(self, user_id, event_id):
+        self.update_user(user_id, self.user_events.get(user_id, set()) - {event_id})
+
+    def similar_users(self, user_id, event_ids, min_similarity=0.1):
+        """Approximate Jaccard-similar users as (user_id, similarity, intersection), best first"""
+        if not event_ids:
+            return []
+        event_ids = set(event_ids)
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._band_keys(self.signature(event_ids))):
+            members = bucket.get(key)
+            if members:
+                candidates |= members
+        candidates.discard(user_id)
+
+        similar = []
+        for other_id in candidates:
+            other_events = self.user_events.get(other_id)
+            if not other_events:
+                continue
+            intersection = len(event_ids & other_events)
+            similarity = intersection / (len(event_ids) + len(other_events) - intersection)
+            if similarity > min_similarity:
+                similar.append((other_id, similarity, intersection))
+
+        similar.sort(key=lambda x: x[1], reverse=True)
+        return similar
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index(bands=16, rows=4):
+    """Return the process-wide index.
+
+    Requests only read it: refresh() rebuilds it on a background task every
+    RECOMMENDER_LSH_MAX_AGE seconds and swaps the new one in, while
+    record_registration keeps it current in between. A cold process (or a
+    change of bands/rows) builds it once, under the lock.
+    """
+    index = _index
+    if index is not None and index.bands == bands and index.rows == rows:
+        return index
+    with _lock:
+        if _index is None or _index.bands != bands or _index.rows != rows:
+            return _refresh_locked(bands, rows)
+        return _index
+
+
+def refresh(bands=16, rows=4):
+    """Rebuild the index and swap it in; readers keep the old one until then"""
+    with _lock:
+        return _refresh_locked(bands, rows)
+
+
+def _refresh_locked(bands, rows):
+    global _index
+    _index = MinHashLSHIndex.build(bands, rows)
+    return _index
+
+
+def invalidate():
+    """Force the next get_index() call to rebuild"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def record_registration(user_id, event_id):
+    """Keep an already built index current; no-op until the LSH mode is first used"""
+    if _index is not None:
+        _index.record_registration(user_id, event_id)
+
+
+def record_unregistration(user_id, event_id):
+    if _index is not None:
+        _index.record_unregistration(user_id, event_id)
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, literal
+from . import db
+from .event import event_registrations
+from .user import User
+
+
+class NotificationRun(db.Model):
+    """One event change or reminder fanned out to its attendees, with delivery progress"""
+    __tablename__ = 'notification_runs'
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: a cancellation run outlives its event
+    event_id = db.Column(db.Integer, nullable=False, index=True)
+    event_title = db.Column(db.String(200), nullable=False)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'updated', 'cancelled' or 'reminder'
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    # Recipients whose send failed; their message went to the email outbox for retries
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    # Keyset position: every recipient up to this user id has been handled
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+    lease_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_notification_runs_status_lease', 'status', 'lease_until'),
+    )
+
+    @property
+    def progress(self):
+        """Handled fraction of the recipients, 0..1"""
+        if not self.total:
+            return 1.0
+        return (self.sent + self.failed) / self.total
+
+
+class NotificationRecipient(db.Model):
+    """Attendees of an event at the time of the change, snapshotted with the run"""
+    __tablename__ = 'notification_recipients'
+
+    run_id = db.Column(db.Integer, db.ForeignKey('notification_runs.id'), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), nullable=False)
+
+
+class Notifications:
+    """Persistent fan-out of event change notifications.
+
+    A run and its recipient list are written in the transaction of the
+    change with one INSERT ... SELECT over event_registrations, so the list
+    survives the deletion of a cancelled event. Delivery walks the list in
+    user_id order and commits last_user_id after each chunk; a worker that
+    dies stops renewing its lease and the next one resumes after the last
+    committed chunk.
+    """
+
+    @staticmethod
+    def create_run(event, kind, subject, body, created_by_id=None):
+        """Queue a notification to every current attendee of event (the caller commits)"""
+        run = NotificationRun(
+            event_id=event.id, event_title=event.title, created_by_id=created_by_id,
+            kind=kind, subject=subject, body=body
+        )
+        db.session.add(run)
+        db.session.flush()
+        run.total = db.session.execute(
+            NotificationRecipient.__table__.insert().from_select(
+                ['run_id', 'user_id', 'email'],
+                select(literal(run.id), User.id, User.email).join(
+                    event_registrations, event_registrations.c.user_id == User.id
+                ).where(event_registrations.c.event_id == event.id)
+            )
+        ).rowcount
+        return run
+
+    @staticmethod
+    def claim(lease_seconds, now=None):
+        """Lease the oldest unfinished run nobody is working on (commits); None when idle"""
+        now = now or datetime.utcnow()
+        candidates = db.session.execute(
+            select(NotificationRun.id).where(
+                NotificationRun.status.in_((NotificationRun.PENDING, NotificationRun.RUNNING)),
+                or_(NotificationRun.lease_until.is_(None), NotificationRun.lease_until < now)
+            ).order_by(NotificationRun.id).limit(5)
+        ).scalars().all()
+        for run_id in candidates:
+            if db.session.execute(
+                update(NotificationRun).where(
+                    NotificationRun.id == run_id,
+                    or_(NotificationRun.lease_until.is_(None), NotificationRun.lease_until < now)
+                ).values(
+                    status=NotificationRun.RUNNING,
+                    lease_until=now + timedelta(seconds=lease_seconds)
+                ).execution_options(synchronize_session=False)
+            ).rowcount:
+                db.session.commit()
+                return db.session.get(NotificationRun, run_id)
+        db.session.commit()
+        return None
+
+    @staticmethod
+    def next_recipients(run, limit):
+        """The next chunk of (user_id, email) after the run's keyset position"""
+        return db.session.execute(
+            select(NotificationRecipient.user_id, NotificationRecipient.email).where(
+                NotificationRecipient.run_id == run.id,
+                NotificationRecipient.user_id > run.last_user_id
+            ).order_by(NotificationRecipient.user_id).limit(limit)
+        ).all()
+
+    @staticmethod
+    def record_chunk(run, last_user_id, sent, failed, lease_seconds):
+        """Commit a delivered chunk and extend the lease"""
+        run.last_user_id = last_user_id
+        run.sent += sent
+        run.failed += failed
+        run.lease_until = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        db.session.commit()
+
+    @staticmethod
+    def finish(run):
+        run.status = NotificationRun.COMPLETED
+        run.lease_until = None
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    @staticmethod
+    def runs_by(user_id, limit=50):
+        return NotificationRun.query.filter_by(created_by_id=user_id).order_by(
+            NotificationRun.id.desc()
+        ).limit(limit).all()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from . import db
+
+
+class OutboxMessage(db.Model):
+    """An email written in the transaction that caused it, sent later by the outbox drain"""
+    __tablename__ = 'email_outbox'
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Earliest time of the next delivery attempt; also the lease of a claimed message
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+class Outbox:
+    """Durable queue of outgoing email.
+
+    Producers add messages inside their own transaction, so a message exists
+    exactly when the change it reports was committed. Delivery claims due
+    messages by pushing next_attempt_at past a lease with a conditional
+    UPDATE: of several workers draining at once, each message goes to one.
+    """
+
+    @staticmethod
+    def enqueue(recipient, subject, body):
+        """Queue a message (the caller commits)"""
+        message = OutboxMessage(recipient=recipient, subject=subject, body=body)
+        db.session.add(message)
+        return message
+
+    @staticmethod
+    def claim(limit, lease_seconds, now=None):
+        """Claim up to limit due messages for lease_seconds; commits and returns them"""
+        now = now or datetime.utcnow()
+        due = db.session.execute(
+            select(OutboxMessage.id, OutboxMessage.next_attempt_at).where(
+                OutboxMessage.status == OutboxMessage.PENDING,
+                OutboxMessage.next_attempt_at <= now
+            ).order_by(OutboxMessage.next_attempt_at, OutboxMessage.id).limit(limit)
+        ).all()
+
+        lease_until = now + timedelta(seconds=lease_seconds)
+        claimed = []
+        for message_id, next_attempt_at in due:
+            if db.session.execute(
+                update(OutboxMessage).where(
+                    OutboxMessage.id == message_id,
+                    OutboxMessage.status == OutboxMessage.PENDING,
+                    OutboxMessage.next_attempt_at == next_attempt_at
+                ).values(next_attempt_at=lease_until).execution_options(synchronize_session=False)
+            ).rowcount:
+                claimed.append(message_id)
+        db.session.commit()
+        if not claimed:
+            return []
+        return OutboxMessage.query.filter(OutboxMessage.id.in_(claimed)).order_by(OutboxMessage.id).all()
+
+    @staticmethod
+    def mark_sent(message, now=None):
+        message.status = OutboxMessage.SENT
+        message.attempts += 1
+        message.sent_at = now or datetime.utcnow()
+        message.last_error = None
+
+    @staticmethod
+    def mark_failed(message, error, retry_base, max_attempts, now=None):
+        """Schedule a retry with exponential backoff, or give up after max_attempts"""
+        now = now or datetime.utcnow()
+        message.attempts += 1
+        message.last_error = str(error)[:1000]
+        if message.attempts >= max_attempts:
+            message.status = OutboxMessage.FAILED
+        else:
+            message.next_attempt_at = now + timedelta(seconds=retry_base * 2 ** (message.attempts - 1))
+
+    @staticmethod
+    def pending_count():
+        return db.session.execute(
+            select(db.func.count()).select_from(OutboxMessage).where(
+                OutboxMessage.status == OutboxMessage.PENDING
+            )
+        ).scalar()
@@ -1,231 +1,311 @@
 from models.event import Event, event_registrations
 from models.user import User
 from models import db
+from models import co_registration_matrix, minhash_index
+from models.event_similarity import EventSimilarityIndex
+from models.trending import TrendingIndex
+from models.user_profile import UserPreferenceProfile
+from flask import current_app
+from extensions import tracer
+from utils.tracing import annotate
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, text, desc, and_, not_
+from sqlalchemy import func, text, desc, and_, not_, select
 from collections import defaultdict, Counter
+import heapq
 import math
 
 class RecommendationEngine:
     @staticmethod
     def get_user_recommendations(user, limit=5):
         """Get personalized event recommendations for a user"""
+        trace = tracer.start('recommendations', user_id=user.id, limit=limit)
         try:
-            print(f"DEBUG: Getting recommendations for user: {user.username}")
-            
             # Get user's registered events
             user_events = user.registered_events
-            user_event_ids = [e.id for e in user_events]
-            
-            print(f"DEBUG: User has registered for {len(user_events)} events")
-            print(f"DEBUG: User event IDs: {user_event_ids}")
             
             if not user_events:
-                print("DEBUG: User has no registered events, using fallback recommendations")
-                return RecommendationEngine._fallback_recommendations(user, limit)
+                with trace.span('fallback') as span:
+                    recommendations = RecommendationEngine._fallback_recommendations(user, limit)
+                    span.set(results=len(recommendations))
+                trace.finish(results=len(recommendations))
+                return recommendations
             
             all_recommendations = []
             
             # 1. Content-based recommendations (50% weight)
-            content_recs = RecommendationEngine._content_based_filtering(user, limit * 2)
-            print(f"DEBUG: Content-based found {len(content_recs)} recommendations")
+            with trace.span('content') as span:
+                content_recs = RecommendationEngine._content_based_filtering(user, limit * 2)
+                span.set(results=len(content_recs))
             for rec in content_recs:
                 rec['score'] = rec.get('score', 0) * 0.5
                 all_recommendations.append(rec)
             
             # 2. Collaborative filtering (25% weight)
-            collab_recs = RecommendationEngine._collaborative_filtering(user, limit)
-            print(f"DEBUG: Collaborative filtering found {len(collab_recs)} recommendations")
+            with trace.span('collaborative') as span:
+                collab_recs = RecommendationEngine._collaborative_filtering(user, limit)
+                span.set(results=len(collab_recs))
             for rec in collab_recs:
                 rec['score'] = rec.get('score', 0) * 0.25
                 all_recommendations.append(rec)
             
             # 3. Popular/Trending events (25% weight)
-            popular_recs = RecommendationEngine._popularity_based_filtering(user, limit)
-            print(f"DEBUG: Popularity-based found {len(popular_recs)} recommendations")
+            with trace.span('popularity') as span:
+                popular_recs = RecommendationEngine._popularity_based_filtering(user, limit)
+                span.set(results=len(popular_recs))
             for rec in popular_recs:
                 rec['score'] = rec.get('score', 0) * 0.25
                 all_recommendations.append(rec)
             
             # Remove duplicates and sort by score
-            seen_events = set()
-            unique_recs = []
-            
-            for rec in sorted(all_recommendations, key=lambda x: x['score'], reverse=True):
-                if rec['event'].id not in seen_events:
-                    seen_events.add(rec['event'].id)
-                    unique_recs.append(rec)
-                    print(f"DEBUG: Added unique rec: {rec['event'].title} - Score: {rec['score']:.3f}")
-            
-            print(f"DEBUG: Final unique recommendations: {len(unique_recs)}")
+            with trace.span('merge', candidates=len(all_recommendations)) as span:
+                seen_events = set()
+                unique_recs = []
+                
+                for rec in sorted(all_recommendations, key=lambda x: x['score'], reverse=True):
+                    if rec['event'].id not in seen_events:
+                        seen_events.add(rec['event'].id)
+                        unique_recs.append(rec)
+                span.set(results=len(unique_recs))
             
             # If we don't have enough recommendations, add fallback
             if len(unique_recs) < limit:
                 fallback_needed = limit - len(unique_recs)
-                print(f"DEBUG: Need {fallback_needed} fallback recommendations")
-                fallback_recs = RecommendationEngine._fallback_recommendations(user, fallback_needed, exclude_ids=seen_events)
+                with trace.span('fallback', needed=fallback_needed) as span:
+                    fallback_recs = RecommendationEngine._fallback_recommendations(user, fallback_needed, exclude_ids=seen_events)
+                    span.set(results=len(fallback_recs))
                 unique_recs.extend(fallback_recs)
             
+            trace.finish(results=min(len(unique_recs), limit))
             return unique_recs[:limit]
             
         except Exception as e:
-            print(f"DEBUG: Recommendation error: {e}")
-            import traceback
-            traceback.print_exc()
+            current_app.logger.exception("Recommendation pipeline failed")
+            trace.finish(error=type(e).__name__)
             return RecommendationEngine._fallback_recommendations(user, limit)
     
     @staticmethod
-    def _content_based_filtering(user, limit):
-        """Improved content-based filtering using start_date"""
-        user_events = user.registered_events
-        if not user_events:
-            return []
+    def _content_score(category, start_date, max_capacity, registered_count,
+                       category_count, location_count, total_events, today):
+        """Score one candidate event given how many of the user's events share its category and location"""
+        score = 0.0
+        reasons = []
         
-        # Get user's registered event IDs
-        user_event_ids = [event.id for event in user_events]
+        # Category preference scoring (most important factor)
+        if category_count:
+            category_preference = category_count / total_events
+            score += category_preference * 0.8  # Strong weight for category match
+            reasons.append(f"matches your interest in {category} events")
         
-        # Analyze user preferences
-        category_counts = Counter([event.category for event in user_events])
-        location_counts = Counter([event.location for event in user_events])
+        # Location preference scoring
+        if location_count:
+            location_preference = location_count / total_events
+            score += location_preference * 0.3
+            reasons.append(f"at your preferred location")
         
-        print(f"DEBUG: User categories: {dict(category_counts)}")
-        print(f"DEBUG: User locations: {dict(location_counts)}")
+        # Time-based scoring (prefer events happening soon)
+        days_until = (start_date - today).days
+        if days_until <= 3:
+            time_boost = 0.4
+            reasons.append("happening very soon")
+        elif days_until <= 7:
+            time_boost = 0.3
+            reasons.append("happening this week")
+        elif days_until <= 30:
+            time_boost = 0.2
+            reasons.append("happening this month")
+        else:
+            time_boost = 0.1
         
-        # Get upcoming events user hasn't registered for
-        available_events = Event.query.filter(
-            Event.start_date >= date.today(),
-            not_(Event.id.in_(user_event_ids))
-        ).all()
+        score += time_boost
         
-        print(f"DEBUG: Found {len(available_events)} available events for content filtering")
+        # Availability scoring
+        if max_capacity and max_capacity > 0:
+            availability_ratio = (max_capacity - registered_count) / max_capacity
+            if availability_ratio > 0.8:
+                score += 0.15
+                reasons.append("has excellent availability")
+            elif availability_ratio > 0.5:
+                score += 0.1
+                reasons.append("has good availability")
         
-        recommendations = []
+        return score, reasons
+    
+    @staticmethod
+    def _content_reason(reasons):
+        return "Recommended because it " + " and ".join(reasons) if reasons else "Based on your activity"
+    
+    @staticmethod
+    def _popularity_score(reg_count, max_capacity, start_date, today):
+        """Fill ratio boosted for events happening soon"""
+        if max_capacity and max_capacity > 0:
+            popularity_ratio = reg_count / max_capacity
+        else:
+            popularity_ratio = min(reg_count / 50, 1.0)  # Assume 50 as average capacity
         
-        for event in available_events:
-            score = 0.0
-            reasons = []
-            
-            # Category preference scoring (most important factor)
-            if event.category in category_counts:
-                category_preference = category_counts[event.category] / len(user_events)
-                category_score = category_preference * 0.8  # Strong weight for category match
-                score += category_score
-                reasons.append(f"matches your interest in {event.category} events")
-                print(f"DEBUG: Event {event.title} - Category '{event.category}' score: {category_score:.3f}")
-            
-            # Location preference scoring
-            if event.location in location_counts:
-                location_preference = location_counts[event.location] / len(user_events)
-                location_score = location_preference * 0.3
-                score += location_score
-                reasons.append(f"at your preferred location")
-                print(f"DEBUG: Event {event.title} - Location score: {location_score:.3f}")
-            
-            # Time-based scoring (prefer events happening soon)
-            days_until = (event.start_date - date.today()).days
-            if days_until <= 3:
-                time_boost = 0.4
-                reasons.append("happening very soon")
-            elif days_until <= 7:
-                time_boost = 0.3
-                reasons.append("happening this week")
-            elif days_until <= 30:
-                time_boost = 0.2
-                reasons.append("happening this month")
-            else:
-                time_boost = 0.1
-            
-            score += time_boost
-            
-            # Availability scoring
-            if hasattr(event, 'max_capacity') and event.max_capacity > 0:
-                registered_count = len(event.registered_users)
-                availability_ratio = (event.max_capacity - registered_count) / event.max_capacity
-                if availability_ratio > 0.8:
-                    score += 0.15
-                    reasons.append("has excellent availability")
-                elif availability_ratio > 0.5:
-                    score += 0.1
-                    reasons.append("has good availability")
+        # Boost recent events
+        days_until = (start_date - today).days
+        recency_factor = max(0.3, 1 - (days_until / 90))  # 90-day decay
+        
+        return popularity_ratio * recency_factor
+    
+    @staticmethod
+    def _content_based_filtering(user, limit):
+        """Content-based filtering scored from the user's preference profile"""
+        profile = UserPreferenceProfile.load(user.id)
+        total_events = profile.total_registrations
+        if not total_events:
+            return []
+        category_counts = profile.category_counts
+        location_counts = profile.location_counts
+        
+        er = event_registrations
+        
+        # Upcoming events the user hasn't registered for, with everything needed to score them
+        today = date.today()
+        candidates = db.session.execute(
+            select(
+                Event.id, Event.category, Event.location, Event.start_date, Event.max_capacity,
+                Event.registration_count
+            ).where(
+                Event.start_date >= today,
+                Event.id.not_in(select(er.c.event_id).where(er.c.user_id == user.id))
+            )
+        ).all()
+        
+        annotate(candidates=len(candidates))
+        
+        scored = []
+        for event_id, category, location, start_date, max_capacity, reg_count in candidates:
+            score, reasons = RecommendationEngine._content_score(
+                category, start_date, max_capacity, reg_count,
+                category_counts.get(category, 0), location_counts.get(location, 0),
+                total_events, today
+            )
             
             # Only include events with meaningful scores
             if score > 0.1:
-                reason_text = "Recommended because it " + " and ".join(reasons) if reasons else "Based on your activity"
-                recommendations.append({
-                    'event': event,
-                    'score': min(score, 1.0),  # Cap at 1.0
-                    'reason': reason_text
-                })
-                print(f"DEBUG: Content-based added {event.title} with score {score:.3f}")
+                scored.append((min(score, 1.0), event_id, reasons))  # Cap at 1.0
+        
+        top = heapq.nlargest(limit, scored, key=lambda x: x[0])
+        events = {event.id: event for event in Event.query.filter(
+            Event.id.in_([event_id for _, event_id, _ in top])
+        ).all()} if top else {}
         
-        return sorted(recommendations, key=lambda x: x['score'], reverse=True)[:limit]
+        return [{
+            'event': events[event_id],
+            'score': score,
+            'reason': RecommendationEngine._content_reason(reasons)
+        } for score, event_id, reasons in top if event_id in events]
     
     @staticmethod
     def _collaborative_filtering(user, limit):
-        """Find users with similar preferences and recommend their events"""
+        """Recommend events co-registered with the user's events (item index) or by similar users"""
         user_event_ids = set([e.id for e in user.registered_events])
         if not user_event_ids:
             return []
         
-        print(f"DEBUG: Starting collaborative filtering")
+        if current_app.config.get('RECOMMENDER_COLLABORATIVE_MODE', 'item') == 'item':
+            return RecommendationEngine._item_based_filtering(user_event_ids, limit)
         
         try:
-            # Find users who registered for at least one common event
-            similar_users_data = []
+            config = current_app.config
+            if config.get('RECOMMENDER_SIMILAR_USERS', 'exact') == 'lsh':
+                # Approximate neighbours from MinHash band collisions
+                index = minhash_index.get_index(
+                    config.get('RECOMMENDER_LSH_BANDS', 16),
+                    config.get('RECOMMENDER_LSH_ROWS', 4)
+                )
+                similar_users_data = index.similar_users(user.id, user_event_ids)
+                neighbor_events = lambda other_id: index.user_events.get(other_id, ())
+                annotate(mode='user_lsh', similar_users=len(similar_users_data))
+            else:
+                # Exact neighbours from sparse row intersections on the co-registration matrix
+                matrix = co_registration_matrix.get_matrix()
+                similar_users_data = matrix.similar_users(user.id, user_event_ids)
+                neighbor_events = matrix.row_events
+                annotate(mode='user', similar_users=len(similar_users_data))
+            
+            # Get recommendations from similar users
+            event_scores = defaultdict(float)
+            
+            for neighbor, similarity, common_events in similar_users_data[:10]:  # Top 10 similar users
+                # Weight by similarity and number of common events
+                weight = similarity * (1 + math.log(common_events))
+                for event_id in neighbor_events(neighbor):
+                    if event_id not in user_event_ids:
+                        event_scores[event_id] += weight
             
-            # Get all users who have registered for events
-            all_users = User.query.join(User.registered_events).filter(
-                User.id != user.id
-            ).distinct().all()
+            if not event_scores:
+                return []
             
-            print(f"DEBUG: Found {len(all_users)} other users to compare")
+            event_objects = {
+                event.id: event for event in Event.query.filter(
+                    Event.id.in_(list(event_scores)),
+                    Event.start_date >= date.today()
+                ).all()
+            }
             
-            for other_user in all_users:
-                other_event_ids = set([e.id for e in other_user.registered_events])
-                if not other_event_ids:
+            recommendations = []
+            for event_id, score in sorted(event_scores.items(), key=lambda x: x[1], reverse=True):
+                event = event_objects.get(event_id)
+                if event is None:
                     continue
-                
-                # Calculate Jaccard similarity
-                intersection = len(user_event_ids & other_event_ids)
-                union = len(user_event_ids | other_event_ids)
-                
-                if intersection > 0 and union > 0:
-                    similarity = intersection / union
-                    if similarity > 0.1:  # Minimum similarity threshold
-                        similar_users_data.append((other_user, similarity, intersection))
-                        print(f"DEBUG: Found similar user {other_user.username} with similarity {similarity:.3f}")
+                recommendations.append({
+                    'event': event,
+                    'score': min(score, 1.0),
+                    'reason': f"Users with similar interests also registered for this event"
+                })
             
-            # Sort by similarity
-            similar_users_data.sort(key=lambda x: x[1], reverse=True)
+            return recommendations[:limit]
             
-            # Get recommendations from similar users
+        except Exception:
+            current_app.logger.exception("Collaborative filtering failed")
+            return []
+    
+    @staticmethod
+    def _item_based_filtering(user_event_ids, limit):
+        """Sum the precomputed neighbour lists of the user's registered events"""
+        try:
+            per_event = current_app.config.get('RECOMMENDER_NEIGHBORS_PER_EVENT', 20)
+            neighbors = EventSimilarityIndex.neighbors(user_event_ids, per_event)
+            
+            candidate_ids = {neighbor_id for _, neighbor_id, _ in neighbors} - user_event_ids
+            annotate(mode='item', neighbors=len(neighbors), candidates=len(candidate_ids))
+            if not candidate_ids:
+                return []
+            
+            counts = EventSimilarityIndex.registration_counts(candidate_ids | user_event_ids)
+            
+            # Cosine similarity between co-registration vectors
             event_scores = defaultdict(float)
-            event_objects = {}
-            
-            for other_user, similarity, common_events in similar_users_data[:10]:  # Top 10 similar users
-                for event in other_user.registered_events:
-                    if (event.id not in user_event_ids and 
-                        event.start_date >= date.today()):
-                        
-                        # Weight by similarity and number of common events
-                        weight = similarity * (1 + math.log(common_events))
-                        event_scores[event.id] += weight
-                        event_objects[event.id] = event
-                        print(f"DEBUG: Collaborative rec: {event.title} += {weight:.3f}")
+            for event_id, neighbor_id, co_count in neighbors:
+                if neighbor_id in candidate_ids:
+                    norm = math.sqrt(counts.get(event_id, 0) * counts.get(neighbor_id, 0))
+                    if norm:
+                        event_scores[neighbor_id] += co_count / norm
+            
+            event_objects = {
+                event.id: event for event in Event.query.filter(
+                    Event.id.in_(list(event_scores)),
+                    Event.start_date >= date.today()
+                ).all()
+            }
             
             recommendations = []
             for event_id, score in sorted(event_scores.items(), key=lambda x: x[1], reverse=True):
-                event = event_objects[event_id]
+                event = event_objects.get(event_id)
+                if event is None:
+                    continue
                 recommendations.append({
                     'event': event,
                     'score': min(score, 1.0),
-                    'reason': f"Users with similar interests also registered for this event"
+                    'reason': "Students who joined your events also registered for this event"
                 })
             
             return recommendations[:limit]
             
-        except Exception as e:
-            print(f"DEBUG: Collaborative filtering error: {e}")
+        except Exception:
+            current_app.logger.exception("Item-based filtering failed")
             return []
     
     @staticmethod
@@ -234,42 +314,35 @@ class RecommendationEngine:
         user_event_ids = [e.id for e in user.registered_events]
         
         try:
-            # Get events with registration counts
+            # Most registered upcoming events, read from the maintained counter
             popular_events = db.session.query(
-                Event,
-                func.count(event_registrations.c.user_id).label('reg_count')
-            ).outerjoin(event_registrations).filter(
+                Event, Event.registration_count
+            ).filter(
                 Event.start_date >= date.today(),
                 not_(Event.id.in_(user_event_ids)) if user_event_ids else True
-            ).group_by(Event.id).order_by(
-                desc(func.count(event_registrations.c.user_id))
+            ).order_by(
+                desc(Event.registration_count)
             ).limit(limit * 2).all()
             
+            annotate(candidates=len(popular_events))
+            
             recommendations = []
+            today = date.today()
             for event, reg_count in popular_events:
-                # Calculate popularity score
-                if hasattr(event, 'max_capacity') and event.max_capacity > 0:
-                    popularity_ratio = reg_count / event.max_capacity
-                else:
-                    popularity_ratio = min(reg_count / 50, 1.0)  # Assume 50 as average capacity
-                
-                # Boost recent events
-                days_until = (event.start_date - date.today()).days
-                recency_factor = max(0.3, 1 - (days_until / 90))  # 90-day decay
-                
-                score = popularity_ratio * recency_factor
+                score = RecommendationEngine._popularity_score(
+                    reg_count, event.max_capacity, event.start_date, today
+                )
                 
                 recommendations.append({
                     'event': event,
                     'score': min(score, 1.0),
                     'reason': f"Popular event with {reg_count} registrations"
                 })
-                print(f"DEBUG: Popular event {event.title} - {reg_count} registrations, score: {score:.3f}")
             
             return sorted(recommendations, key=lambda x: x['score'], reverse=True)[:limit]
             
-        except Exception as e:
-            print(f"DEBUG: Popularity filtering error: {e}")
+        except Exception:
+            current_app.logger.exception("Popularity filtering failed")
             return []
     
     @staticmethod
@@ -281,8 +354,6 @@ class RecommendationEngine:
         user_event_ids = [e.id for e in user.registered_events]
         all_exclude_ids = set(user_event_ids) | exclude_ids
         
-        print(f"DEBUG: Fallback recommendations, excluding {len(all_exclude_ids)} events")
-        
         # Get upcoming events user hasn't registered for
         query = Event.query.filter(Event.start_date >= date.today())
         
@@ -291,8 +362,6 @@ class RecommendationEngine:
         
         events = query.order_by(Event.start_date).limit(limit).all()
         
-        print(f"DEBUG: Fallback found {len(events)} events")
-        
         return [{
             'event': event,
             'score': 0.1,
@@ -301,44 +370,24 @@ class RecommendationEngine:
     
     @staticmethod
     def get_trending_events(limit=10):
-        """Get trending events based on recent registrations"""
+        """Get trending events ranked by exponentially decayed registration activity"""
         try:
-            print(f"DEBUG: Getting trending events")
-            
-            # Get events with registration counts
-            trending = db.session.query(
-                Event,
-                func.count(event_registrations.c.user_id).label('registration_count')
-            ).outerjoin(event_registrations).filter(
-                Event.start_date >= date.today()
-            ).group_by(Event.id).having(
-                func.count(event_registrations.c.user_id) >= 0  # Include all events
-            ).order_by(
-                desc(func.count(event_registrations.c.user_id)),
-                Event.start_date
-            ).limit(limit).all()
-            
-            result = []
-            for event, reg_count in trending:
-                result.append({
-                    'event': event,
-                    'registration_count': reg_count
-                })
-                print(f"DEBUG: Trending event: {event.title} - {reg_count} registrations")
+            # Read the materialized, time-decayed ranking
+            result = TrendingIndex.top(
+                limit, current_app.config.get('TRENDING_WINDOW_HOURS', 168)
+            )
             
             return result
             
-        except Exception as e:
-            print(f"DEBUG: Error getting trending events: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            current_app.logger.exception("Trending lookup failed")
             
             # Fallback: return upcoming events
             upcoming_events = Event.query.filter(
                 Event.start_date >= date.today()
             ).order_by(Event.start_date).limit(limit).all()
             
-            return [{'event': event, 'registration_count': len(event.registered_users)} 
+            return [{'event': event, 'registration_count': event.registration_count} 
                    for event in upcoming_events]
 
 # Global functions for easy importing
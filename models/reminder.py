@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+
+class ReminderDispatch(db.Model):
+    """Lease on one reminder: the row that wins the unique key sends it"""
+    __tablename__ = 'reminder_dispatches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, nullable=False)
+    offset_minutes = db.Column(db.Integer, nullable=False)
+    # Part of the key so a rescheduled event gets reminded again for its new time
+    starts_at = db.Column(db.DateTime, nullable=False)
+    run_id = db.Column(db.Integer, db.ForeignKey('notification_runs.id'))
+    dispatched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'offset_minutes', 'starts_at', name='uq_reminder_dispatches_event_offset_start'),
+    )
+
+    @staticmethod
+    def acquire(event_id, offset_minutes, starts_at):
+        """Insert the lease row (the caller commits); None, rolled back, when another worker holds it"""
+        dispatch = ReminderDispatch(event_id=event_id, offset_minutes=offset_minutes, starts_at=starts_at)
+        db.session.add(dispatch)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+        return dispatch
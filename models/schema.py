@@ -0,0 +1,185 @@
+from datetime import datetime
+from sqlalchemy import bindparam, inspect, select, text
+from . import db
+from .event import Event, event_registrations
+from .user_profile import UserPreferenceProfile
+from .event_search import create_fts_index
+
+
+class SchemaVersion(db.Model):
+    """One row per applied migration"""
+    __tablename__ = 'schema_version'
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register an upgrade step; steps run once each, in version order"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def ensure_column(conn, table, column, ddl, backfill=None):
+    """Add a column that db.create_all() cannot add to an existing table"""
+    columns = {c['name'] for c in inspect(conn).get_columns(table)}
+    if column in columns:
+        return False
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+    if backfill:
+        conn.execute(text(backfill))
+    return True
+
+
+def ensure_indexes(conn, *names):
+    """Create indexes declared on the models, by name, if they are missing"""
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+@migration(1, 'events.registration_count counter')
+def _add_registration_count(conn):
+    ensure_column(
+        conn, 'events', 'registration_count', 'INTEGER NOT NULL DEFAULT 0',
+        backfill=RECOUNT_REGISTRATIONS
+    )
+
+
+@migration(2, 'indexes for the event listing, registration and recommendation queries')
+def _add_hot_query_indexes(conn):
+    ensure_indexes(
+        conn,
+        'ix_events_start_date_start_time',
+        'ix_events_category_start_date',
+        'ix_events_creator_start_date',
+        'ix_event_registrations_event_user',
+        'ix_user_recommendations_event_id',
+    )
+
+
+@migration(3, 'events_fts full-text index with sync triggers')
+def _add_event_fts(conn):
+    create_fts_index(conn)
+
+
+@migration(4, 'events.starts_at/ends_at timestamps and lifecycle status')
+def _add_event_schedule(conn):
+    ensure_column(conn, 'events', 'starts_at', 'DATETIME')
+    ensure_column(conn, 'events', 'ends_at', 'DATETIME')
+    ensure_column(conn, 'events', 'status', "VARCHAR(20) NOT NULL DEFAULT 'scheduled'")
+    events = Event.__table__
+    now = datetime.now()
+    rows = []
+    for row in conn.execute(select(
+            events.c.id, events.c.start_date, events.c.start_time, events.c.end_date, events.c.end_time
+    ).where(events.c.starts_at.is_(None))):
+        starts_at = datetime.combine(row.start_date, row.start_time)
+        ends_at = datetime.combine(row.end_date, row.end_time)
+        rows.append({
+            'event_id': row.id, 'starts_at': starts_at, 'ends_at': ends_at,
+            'status': Event.status_at(starts_at, ends_at, now)
+        })
+    if rows:
+        conn.execute(
+            events.update().where(events.c.id == bindparam('event_id')).values(
+                starts_at=bindparam('starts_at'), ends_at=bindparam('ends_at'), status=bindparam('status')
+            ),
+            rows
+        )
+    ensure_indexes(conn, 'ix_events_starts_at', 'ix_events_status_starts_at')
+
+
+@migration(5, 'user_preference_profiles for users registered before profiles existed')
+def _backfill_preference_profiles(conn):
+    profiles = UserPreferenceProfile.__table__
+    events = Event.__table__
+    built = {}
+    for user_id, category, location, registered_at in conn.execute(
+        select(event_registrations.c.user_id, events.c.category, events.c.location,
+               event_registrations.c.registered_at)
+        .join(events, events.c.id == event_registrations.c.event_id)
+        .where(event_registrations.c.user_id.not_in(select(profiles.c.user_id)))
+    ):
+        profile = built.setdefault(user_id, {
+            'user_id': user_id, 'category_counts': {}, 'location_counts': {},
+            'total_registrations': 0, 'last_activity_at': None
+        })
+        profile['category_counts'][category] = profile['category_counts'].get(category, 0) + 1
+        profile['location_counts'][location] = profile['location_counts'].get(location, 0) + 1
+        profile['total_registrations'] += 1
+        if registered_at and (profile['last_activity_at'] is None or registered_at > profile['last_activity_at']):
+            profile['last_activity_at'] = registered_at
+    if built:
+        conn.execute(profiles.insert(), list(built.values()))
+
+
+@migration(6, 'waitlist_entries.seq and waitlist_counters for indexed queue positions')
+def _add_waitlist_sequence(conn):
+    if ensure_column(conn, 'waitlist_entries', 'seq', 'INTEGER NOT NULL DEFAULT 0'):
+        conn.execute(text("""
+            UPDATE waitlist_entries SET seq = (
+                SELECT COUNT(*) FROM waitlist_entries AS earlier
+                WHERE earlier.event_id = waitlist_entries.event_id AND earlier.id <= waitlist_entries.id
+            )
+        """))
+    conn.execute(text("""
+        INSERT OR IGNORE INTO waitlist_counters (event_id, head, tail)
+        SELECT event_id, 0, COUNT(*) FROM waitlist_entries GROUP BY event_id
+    """))
+
+
+@migration(7, 'waitlist_entries (event_id, seq) index for gap-tolerant queue positions')
+def _add_waitlist_seq_index(conn):
+    ensure_indexes(conn, 'ix_waitlist_entries_event_seq')
+
+
+def current_version():
+    with db.engine.connect() as conn:
+        return conn.execute(db.select(db.func.max(SchemaVersion.version))).scalar() or 0
+
+
+def upgrade_schema():
+    """Apply pending migrations; each one commits together with its version row.
+
+    Runs after db.create_all(), so on a fresh database the steps find their
+    columns and indexes already present and only record the version.
+    """
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    current = current_version()
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with db.engine.begin() as conn:
+            # Another worker may have applied it since we looked
+            if conn.execute(db.select(SchemaVersion.version).where(
+                    SchemaVersion.version == version)).first():
+                continue
+            step(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append((version, description))
+    return applied
+
+
+RECOUNT_REGISTRATIONS = """
+    UPDATE events SET registration_count = (
+        SELECT COUNT(*) FROM event_registrations WHERE event_registrations.event_id = events.id
+    )
+"""
+
+
+def recount_registrations():
+    """Resynchronize events.registration_count with event_registrations"""
+    result = db.session.execute(text(RECOUNT_REGISTRATIONS))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,207 @@
+from datetime import datetime, date, timedelta
+import math
+import sqlite3
+
+from sqlalchemy import event, select, func, delete, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .event import Event, event_registrations
+
+# Fixed reference point for forward-decayed scores
+DECAY_EPOCH = datetime(2024, 1, 1)
+
+
+class EventRegistrationBucket(db.Model):
+    """Registrations an event received during one hour"""
+    __tablename__ = 'event_registration_buckets'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class EventTrendingScore(db.Model):
+    """Materialized, exponentially decayed trending score of an event.
+
+    ``log_score`` is the log of sum(count * exp(rate * (bucket - epoch)))
+    over the event's hourly buckets. Weighting each registration forward
+    from a fixed epoch gives the same order as decaying every score back
+    from "now", so no row has to change as time passes and the ranking is
+    simply the index on log_score.
+    """
+    __tablename__ = 'event_trending_scores'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    log_score = db.Column(db.Float, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+@event.listens_for(Engine, 'connect')
+def _register_math_functions(dbapi_connection, connection_record):
+    """ln()/exp() for the score upsert: built into SQLite only when compiled with math functions"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('ln', 1, math.log, deterministic=True)
+        dbapi_connection.create_function('exp', 1, math.exp, deterministic=True)
+
+
+def _bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _log_weight(bucket_start, half_life_hours):
+    rate = math.log(2) / half_life_hours
+    return rate * (bucket_start - DECAY_EPOCH).total_seconds() / 3600
+
+
+def _log_add(a, b):
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+class TrendingIndex:
+    """Rolling hourly registration counters and the decayed ranking built on them"""
+
+    @staticmethod
+    def record_registration(event_id, registered_at=None, half_life_hours=24):
+        """Count a registration; upserts, so concurrent first registrations of an hour both land"""
+        bucket_start = _bucket(registered_at or datetime.utcnow())
+
+        buckets = EventRegistrationBucket.__table__
+        stmt = sqlite_insert(buckets).values(event_id=event_id, bucket_start=bucket_start, count=1)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['event_id', 'bucket_start'],
+            set_={'count': buckets.c.count + 1}
+        ))
+
+        # log(exp(a) + exp(b)) evaluated in the UPDATE, so a concurrent registration is not lost
+        weight = _log_weight(bucket_start, half_life_hours)
+        scores = EventTrendingScore.__table__
+        high = func.max(scores.c.log_score, weight)
+        low = func.min(scores.c.log_score, weight)
+        stmt = sqlite_insert(scores).values(event_id=event_id, log_score=weight, updated_at=datetime.utcnow())
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['event_id'],
+            set_={'log_score': high + func.ln(1 + func.exp(low - high)), 'updated_at': datetime.utcnow()}
+        ))
+
+    @staticmethod
+    def record_unregistration(event_id, registered_at, half_life_hours=24):
+        if registered_at is not None:
+            bucket_start = _bucket(registered_at)
+            db.session.execute(update(EventRegistrationBucket).where(
+                EventRegistrationBucket.event_id == event_id,
+                EventRegistrationBucket.bucket_start == bucket_start
+            ).values(count=EventRegistrationBucket.count - 1).execution_options(synchronize_session=False))
+            db.session.execute(delete(EventRegistrationBucket).where(
+                EventRegistrationBucket.event_id == event_id,
+                EventRegistrationBucket.bucket_start == bucket_start,
+                EventRegistrationBucket.count <= 0
+            ).execution_options(synchronize_session=False))
+        TrendingIndex._rescore(event_id, half_life_hours)
+
+    @staticmethod
+    def _rescore(event_id, half_life_hours):
+        """Recompute one event's score from its buckets"""
+        log_score = None
+        for bucket_start, count in db.session.execute(
+            select(EventRegistrationBucket.bucket_start, EventRegistrationBucket.count)
+            .where(EventRegistrationBucket.event_id == event_id)
+        ).all():
+            log_score = _log_add(log_score, _log_weight(bucket_start, half_life_hours) + math.log(count))
+
+        if log_score is None:
+            db.session.execute(delete(EventTrendingScore).where(
+                EventTrendingScore.event_id == event_id
+            ).execution_options(synchronize_session=False))
+            return
+        stmt = sqlite_insert(EventTrendingScore.__table__).values(
+            event_id=event_id, log_score=log_score, updated_at=datetime.utcnow()
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['event_id'],
+            set_={'log_score': log_score, 'updated_at': datetime.utcnow()}
+        ))
+
+    @staticmethod
+    def remove_event(event_id):
+        EventRegistrationBucket.query.filter_by(event_id=event_id).delete()
+        EventTrendingScore.query.filter_by(event_id=event_id).delete()
+
+    @staticmethod
+    def top(limit=10, window_hours=168):
+        """Highest scoring upcoming events with their registrations in the recent window"""
+        ranked = db.session.query(Event).join(
+            EventTrendingScore, EventTrendingScore.event_id == Event.id
+        ).filter(
+            Event.start_date >= date.today()
+        ).order_by(EventTrendingScore.log_score.desc()).limit(limit).all()
+
+        # Pad with the soonest upcoming events when too few have registrations
+        if len(ranked) < limit:
+            ranked.extend(Event.query.filter(
+                Event.start_date >= date.today(),
+                Event.id.not_in([event.id for event in ranked])
+            ).order_by(Event.start_date, Event.start_time).limit(limit - len(ranked)).all())
+
+        since = _bucket(datetime.utcnow()) - timedelta(hours=window_hours)
+        recent = dict(db.session.execute(
+            select(EventRegistrationBucket.event_id, func.sum(EventRegistrationBucket.count))
+            .where(
+                EventRegistrationBucket.event_id.in_([event.id for event in ranked]),
+                EventRegistrationBucket.bucket_start >= since
+            ).group_by(EventRegistrationBucket.event_id)
+        ).all()) if ranked else {}
+
+        return [{
+            'event': event,
+            'registration_count': recent.get(event.id, 0)
+        } for event in ranked]
+
+    @staticmethod
+    def prune_past_events():
+        """Drop the scores and hourly buckets of events that have already started"""
+        past = select(Event.id).where(Event.start_date < date.today())
+        removed = EventTrendingScore.query.filter(
+            EventTrendingScore.event_id.in_(past)
+        ).delete(synchronize_session=False)
+        EventRegistrationBucket.query.filter(
+            EventRegistrationBucket.event_id.in_(past)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    @staticmethod
+    def rebuild(half_life_hours=24):
+        """Recompute buckets and scores from event_registrations.registered_at"""
+        er = event_registrations
+        hour = func.strftime('%Y-%m-%d %H:00:00', er.c.registered_at)
+        rows = db.session.execute(
+            select(er.c.event_id, hour, func.count())
+            .where(er.c.registered_at.is_not(None))
+            .group_by(er.c.event_id, hour)
+        ).all()
+
+        db.session.execute(EventRegistrationBucket.__table__.delete())
+        db.session.execute(EventTrendingScore.__table__.delete())
+
+        buckets = []
+        scores = {}
+        for event_id, bucket_text, count in rows:
+            bucket_start = datetime.strptime(bucket_text, '%Y-%m-%d %H:%M:%S')
+            buckets.append({'event_id': event_id, 'bucket_start': bucket_start, 'count': count})
+            scores[event_id] = _log_add(
+                scores.get(event_id), _log_weight(bucket_start, half_life_hours) + math.log(count)
+            )
+
+        if buckets:
+            db.session.execute(EventRegistrationBucket.__table__.insert(), buckets)
+            db.session.execute(EventTrendingScore.__table__.insert(), [
+                {'event_id': event_id, 'log_score': log_score, 'updated_at': datetime.utcnow()}
+                for event_id, log_score in scores.items()
+            ])
+        db.session.commit()
+        return len(scores)
@@ -0,0 +1,153 @@
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import JSON, insert as sqlite_insert
+from sqlalchemy.ext.mutable import MutableDict
+from . import db
+from .event import Event, event_registrations
+
+
+class UserPreferenceProfile(db.Model):
+    """Running category/location histogram of a user's registrations"""
+    __tablename__ = 'user_preference_profiles'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category_counts = db.Column(MutableDict.as_mutable(JSON), default=dict, nullable=False)
+    location_counts = db.Column(MutableDict.as_mutable(JSON), default=dict, nullable=False)
+    total_registrations = db.Column(db.Integer, default=0, nullable=False)
+    last_activity_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def get_or_build(user_id):
+        """Load a user's profile for an update, building it from their registrations the first time"""
+        profile = db.session.get(UserPreferenceProfile, user_id)
+        if profile is None:
+            profile = UserPreferenceProfile.rebuild(user_id)
+        return profile
+
+    @staticmethod
+    def load(user_id):
+        """A user's profile for reading; never writes.
+
+        Users whose profile was not built yet (migration 5 backfills them) get
+        a transient one computed from their registrations and kept out of the
+        session, so a read path does not autoflush an INSERT.
+        """
+        profile = db.session.get(UserPreferenceProfile, user_id)
+        if profile is None:
+            profile = UserPreferenceProfile(user_id=user_id)
+            profile._fill(UserPreferenceProfile._registration_rows(user_id))
+        return profile
+
+    @staticmethod
+    def rebuild(user_id):
+        """Recompute a profile from event_registrations"""
+        rows = UserPreferenceProfile._registration_rows(user_id)
+        profile = db.session.get(UserPreferenceProfile, user_id)
+        if profile is None:
+            profile = UserPreferenceProfile(user_id=user_id)
+            db.session.add(profile)
+        profile._fill(rows)
+        return profile
+
+    @staticmethod
+    def _registration_rows(user_id):
+        return db.session.execute(
+            select(Event.category, Event.location, event_registrations.c.registered_at)
+            .join(event_registrations, event_registrations.c.event_id == Event.id)
+            .where(event_registrations.c.user_id == user_id)
+        ).all()
+
+    def _fill(self, rows):
+        """Set the histograms from (category, location, registered_at) rows"""
+        categories = {}
+        locations = {}
+        for category, location, _ in rows:
+            categories[category] = categories.get(category, 0) + 1
+            locations[location] = locations.get(location, 0) + 1
+        self.category_counts = categories
+        self.location_counts = locations
+        self.total_registrations = len(rows)
+        self.last_activity_at = max((r.registered_at for r in rows if r.registered_at), default=None)
+
+    def record_registration(self, event):
+        self._adjust(self.category_counts, event.category, 1)
+        self._adjust(self.location_counts, event.location, 1)
+        self.total_registrations += 1
+        self.last_activity_at = datetime.utcnow()
+
+    def record_unregistration(self, event):
+        self._adjust(self.category_counts, event.category, -1)
+        self._adjust(self.location_counts, event.location, -1)
+        self.total_registrations = max(0, self.total_registrations - 1)
+        self.last_activity_at = datetime.utcnow()
+
+    @staticmethod
+    def _adjust(counts, key, delta):
+        value = counts.get(key, 0) + delta
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    @staticmethod
+    def rebuild_many(user_ids):
+        """Recompute several profiles with one grouped query and one bulk upsert.
+
+        Bypasses the session, so profiles already loaded in it are stale until
+        the next commit expires them.
+        """
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return 0
+        rows = db.session.execute(
+            select(
+                event_registrations.c.user_id, Event.category, Event.location,
+                func.count(), func.max(event_registrations.c.registered_at),
+            )
+            .join(event_registrations, event_registrations.c.event_id == Event.id)
+            .where(event_registrations.c.user_id.in_(user_ids))
+            .group_by(event_registrations.c.user_id, Event.category, Event.location)
+        ).all()
+
+        profiles = {
+            user_id: {'user_id': user_id, 'category_counts': {}, 'location_counts': {},
+                      'total_registrations': 0, 'last_activity_at': None}
+            for user_id in user_ids
+        }
+        for user_id, category, location, count, last in rows:
+            profile = profiles[user_id]
+            profile['category_counts'][category] = profile['category_counts'].get(category, 0) + count
+            profile['location_counts'][location] = profile['location_counts'].get(location, 0) + count
+            profile['total_registrations'] += count
+            if last and (profile['last_activity_at'] is None or last > profile['last_activity_at']):
+                profile['last_activity_at'] = last
+
+        stmt = sqlite_insert(UserPreferenceProfile.__table__)
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['user_id'],
+                set_={column: stmt.excluded[column] for column in (
+                    'category_counts', 'location_counts', 'total_registrations', 'last_activity_at'
+                )},
+            ),
+            list(profiles.values()),
+        )
+        return len(profiles)
+
+    @staticmethod
+    def rebuild_attendees(event_id):
+        """Recompute the profiles of everyone registered for an event (after an admin edit)"""
+        user_ids = db.session.execute(
+            select(event_registrations.c.user_id).where(event_registrations.c.event_id == event_id)
+        ).scalars().all()
+        return UserPreferenceProfile.rebuild_many(user_ids)
+
+    @staticmethod
+    def rebuild_all():
+        UserPreferenceProfile.query.delete()
+        user_ids = db.session.execute(
+            select(event_registrations.c.user_id).distinct()
+        ).scalars().all()
+        UserPreferenceProfile.rebuild_many(user_ids)
+        db.session.commit()
+        return len(user_ids)
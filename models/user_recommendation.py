@@ -0,0 +1,22 @@
+from datetime import datetime
+from . import db
+
+
+class UserRecommendation(db.Model):
+    """Precomputed top-K recommendation row written by the offline batch job"""
+    __tablename__ = 'user_recommendations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    reason = db.Column(db.String(255), nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    event = db.relationship('Event')
+
+    __table_args__ = (
+        db.Index('ix_user_recommendations_user_rank', 'user_id', 'rank'),
+        db.Index('ix_user_recommendations_event_id', 'event_id'),
+    )
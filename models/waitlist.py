@@ -0,0 +1,127 @@
+from datetime import datetime
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import db
+
+
+class WaitlistEntry(db.Model):
+    """A student queued for a full event; the autoincrement id is the queue order"""
+    __tablename__ = 'waitlist_entries'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Join order within the event's queue; leaving leaves a gap, so only the order counts
+    seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_id', name='uq_waitlist_entries_event_user'),
+        db.Index('ix_waitlist_entries_event_id_id', 'event_id', 'id'),
+        db.Index('ix_waitlist_entries_event_seq', 'event_id', 'seq'),
+    )
+
+
+class WaitlistCounter(db.Model):
+    """Bounds of an event's queue: tail is the last seq handed out, head counts entries gone since"""
+    __tablename__ = 'waitlist_counters'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    head = db.Column(db.Integer, nullable=False, default=0)
+    tail = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Waitlist:
+    """FIFO queue of students per event.
+
+    Entries carry increasing sequence numbers that may have gaps, so a
+    position is the number of entries up to and including one's own seq: a
+    range count on the (event_id, seq) index. Joining moves the tail counter
+    by one, and promoting or leaving moves the head counter by one, so the
+    queue length is tail - head and no other entry is ever rewritten. Promotion
+    claims an entry by deleting it: of two workers racing for the same head
+    entry only one deletes a row, the other moves on to the next entry.
+    """
+
+    @staticmethod
+    def join(user_id, event_id):
+        """Append a user to the queue (the caller commits); returns their position"""
+        counters = WaitlistCounter.__table__
+        db.session.execute(
+            sqlite_insert(counters).values(event_id=event_id, head=0, tail=1).on_conflict_do_update(
+                index_elements=['event_id'], set_={'tail': counters.c.tail + 1}
+            )
+        )
+        head, tail = db.session.execute(
+            select(WaitlistCounter.head, WaitlistCounter.tail).where(WaitlistCounter.event_id == event_id)
+        ).one()
+        db.session.add(WaitlistEntry(event_id=event_id, user_id=user_id, seq=tail))
+        db.session.flush()
+        return tail - head
+
+    @staticmethod
+    def leave(user_id, event_id):
+        """Remove a user from the queue; returns whether they were on it"""
+        if not db.session.execute(
+            delete(WaitlistEntry).where(
+                WaitlistEntry.event_id == event_id,
+                WaitlistEntry.user_id == user_id
+            ).execution_options(synchronize_session=False)
+        ).rowcount:
+            return False
+        db.session.execute(
+            update(WaitlistCounter).where(WaitlistCounter.event_id == event_id)
+            .values(head=WaitlistCounter.head + 1).execution_options(synchronize_session=False)
+        )
+        return True
+
+    @staticmethod
+    def position(user_id, event_id):
+        """1-based queue position, or None when the user is not waitlisted"""
+        mine = select(WaitlistEntry.seq).where(
+            WaitlistEntry.event_id == event_id,
+            WaitlistEntry.user_id == user_id
+        ).scalar_subquery()
+        return db.session.execute(
+            select(func.count()).select_from(WaitlistEntry).where(
+                WaitlistEntry.event_id == event_id,
+                WaitlistEntry.seq <= mine
+            )
+        ).scalar() or None
+
+    @staticmethod
+    def length(event_id):
+        return db.session.execute(
+            select(WaitlistCounter.tail - WaitlistCounter.head).where(WaitlistCounter.event_id == event_id)
+        ).scalar() or 0
+
+    @staticmethod
+    def pop(event_id):
+        """Claim the head of the queue; returns its user id or None when empty"""
+        while True:
+            head = db.session.execute(
+                select(WaitlistEntry.id, WaitlistEntry.user_id)
+                .where(WaitlistEntry.event_id == event_id)
+                .order_by(WaitlistEntry.id)
+                .limit(1)
+            ).first()
+            if head is None:
+                return None
+            claimed = db.session.execute(
+                WaitlistEntry.__table__.delete().where(WaitlistEntry.id == head.id)
+            ).rowcount
+            if claimed:
+                db.session.execute(
+                    update(WaitlistCounter).where(WaitlistCounter.event_id == event_id)
+                    .values(head=WaitlistCounter.head + 1).execution_options(synchronize_session=False)
+                )
+                return head.user_id
+
+    @staticmethod
+    def remove_event(event_id):
+        db.session.execute(
+            WaitlistEntry.__table__.delete().where(WaitlistEntry.event_id == event_id)
+        )
+        db.session.execute(
+            WaitlistCounter.__table__.delete().where(WaitlistCounter.event_id == event_id)
+        )
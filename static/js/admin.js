@@ -43,14 +43,6 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-    
-    // Auto-refresh dashboard stats every 30 seconds
-    if (window.location.pathname.includes('/admin/dashboard')) {
-        setInterval(function() {
-            // You can implement AJAX refresh here if needed
-            console.log('Dashboard stats could be refreshed here');
-        }, 30000);
-    }
 });
                            
 
@@ -0,0 +1,36 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Bulk certificate jobs: poll the job's progress while it runs, then reload
+    // the page so the generated certificates show up
+    const POLL_INTERVAL = 2000;
+
+    document.querySelectorAll('[data-certificate-job-url]').forEach(function(element) {
+        const bar = element.querySelector('.progress-bar');
+        const label = element.querySelector('[data-job-progress]');
+
+        function poll() {
+            fetch(element.dataset.certificateJobUrl, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.json())
+                .then(job => {
+                    const handled = job.done + job.failed;
+                    const percent = job.total ? Math.round(100 * handled / job.total) : 0;
+                    if (bar) {
+                        bar.style.width = percent + '%';
+                    }
+                    if (label) {
+                        label.textContent = `${handled} / ${job.total}`;
+                    }
+                    if (job.status === 'completed' || job.status === 'failed') {
+                        window.location.reload();
+                    } else {
+                        setTimeout(poll, POLL_INTERVAL);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    setTimeout(poll, POLL_INTERVAL * 5);
+                });
+        }
+
+        setTimeout(poll, POLL_INTERVAL);
+    });
+});
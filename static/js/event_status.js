@@ -0,0 +1,121 @@
+(function() {
+    // Keep registration counts and live/full badges of every [data-event-id]
+    // element current. Updates are pushed over one server-sent events stream;
+    // browsers without EventSource (or when the stream cannot be opened) fall
+    // back to a batched poll that sends the last ETag, so an unchanged poll
+    // costs a bodiless 304.
+    const script = document.currentScript;
+    const statusUrl = script.dataset.statusUrl;
+    const streamUrl = script.dataset.streamUrl;
+    const POLL_INTERVAL = 30000;
+    let etag = null;
+    let source = null;
+    let streamedIds = '';
+    let pollTimer = null;
+
+    function toggle(element, selector, visible) {
+        const badge = element.querySelector(selector);
+        if (badge) {
+            badge.classList.toggle('d-none', !visible);
+        }
+    }
+
+    function setText(element, selector, value) {
+        const target = element.querySelector(selector);
+        if (target) {
+            target.textContent = value;
+        }
+    }
+
+    function currentIds() {
+        const elements = document.querySelectorAll('[data-event-id]');
+        return Array.from(new Set(Array.from(elements, el => el.dataset.eventId))).sort();
+    }
+
+    function apply(eventId, status) {
+        document.querySelectorAll('[data-event-id="' + eventId + '"]').forEach(function(element) {
+            setText(element, '[data-status-count]', status.registration_count);
+            setText(element, '[data-status-capacity]', status.max_capacity);
+            toggle(element, '[data-status-ongoing]', status.is_ongoing);
+            toggle(element, '[data-status-full]', status.is_full);
+        });
+    }
+
+    function poll() {
+        const ids = currentIds();
+        if (!ids.length || document.hidden) {
+            return;
+        }
+
+        const headers = etag ? {'If-None-Match': etag} : {};
+        fetch(statusUrl + '?ids=' + ids.join(','), {headers: headers, cache: 'no-store'})
+            .then(response => {
+                if (response.status === 304 || !response.ok) {
+                    return null;
+                }
+                etag = response.headers.get('ETag');
+                return response.json();
+            })
+            .then(data => {
+                if (data) {
+                    Object.keys(data.events).forEach(id => apply(id, data.events[id]));
+                }
+            })
+            .catch(error => console.error('Error:', error));
+    }
+
+    function startPolling() {
+        if (!pollTimer) {
+            pollTimer = setInterval(poll, POLL_INTERVAL);
+        }
+    }
+
+    function subscribe() {
+        const ids = currentIds().join(',');
+        if (ids === streamedIds) {
+            return;
+        }
+        if (source) {
+            source.close();
+        }
+        streamedIds = ids;
+        if (!ids) {
+            source = null;
+            return;
+        }
+
+        source = new EventSource(streamUrl + '?ids=' + ids);
+        source.addEventListener('snapshot', function(message) {
+            const events = JSON.parse(message.data);
+            Object.keys(events).forEach(id => apply(id, events[id]));
+        });
+        source.addEventListener('status', function(message) {
+            const status = JSON.parse(message.data);
+            apply(status.event_id, status);
+        });
+        source.onerror = function() {
+            // EventSource reconnects by itself; it only gives up on a non-stream response
+            if (source.readyState === EventSource.CLOSED) {
+                source = null;
+                startPolling();
+            }
+        };
+    }
+
+    if (!window.EventSource || !streamUrl) {
+        startPolling();
+        return;
+    }
+
+    subscribe();
+    // "Load more" appends new events; reopen the stream to cover them
+    let pending = null;
+    new MutationObserver(function() {
+        clearTimeout(pending);
+        pending = setTimeout(function() {
+            if (source || !pollTimer) {
+                subscribe();
+            }
+        }, 500);
+    }).observe(document.body, {childList: true, subtree: true});
+})();
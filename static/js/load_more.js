@@ -0,0 +1,33 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // "Load more" buttons: fetch the next keyset page as JSON and append its rendered rows
+    document.querySelectorAll('[data-load-more]').forEach(function(button) {
+        button.addEventListener('click', function() {
+            const target = document.querySelector(button.dataset.target);
+            const url = new URL(button.dataset.url, window.location.origin);
+            url.searchParams.set('cursor', button.dataset.cursor);
+            url.searchParams.set('format', 'json');
+
+            const originalText = button.innerHTML;
+            button.disabled = true;
+            button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Loading...';
+
+            fetch(url)
+                .then(response => response.json())
+                .then(data => {
+                    target.insertAdjacentHTML('beforeend', data.html);
+                    if (data.next_cursor) {
+                        button.dataset.cursor = data.next_cursor;
+                        button.disabled = false;
+                        button.innerHTML = originalText;
+                    } else {
+                        button.remove();
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    button.disabled = false;
+                    button.innerHTML = originalText;
+                });
+        });
+    });
+});
@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class BackgroundTasks:
+    """Periodic maintenance jobs run on daemon threads of the web workers.
+
+    Threads start with the first request a worker serves, so CLI commands
+    and migrations never race them, and not at all in testing. Under the
+    gevent worker the threads are greenlets. Each run gets its own app
+    context (and therefore its own database session). Tasks are keyed by
+    name, so calling create_app() again in one process replaces them
+    instead of starting duplicate threads.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self._tasks = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('BACKGROUND_TASKS_ENABLED', self.enabled)
+        if 'background_tasks' not in app.extensions:
+            app.extensions['background_tasks'] = self
+            app.before_request(self._start)
+
+    def every(self, seconds, func, name):
+        """Run func every seconds (0 or None disables it)"""
+        if seconds:
+            self._tasks[name] = (seconds, func)
+        else:
+            self._tasks.pop(name, None)
+
+    def _start(self):
+        if self._started or not self.enabled or self.app.testing:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for name, (seconds, func) in self._tasks.items():
+            threading.Thread(target=self._run, args=(name, seconds, func), name=name, daemon=True).start()
+
+    def _run(self, name, seconds, func):
+        while True:
+            with self.app.app_context():
+                try:
+                    func()
+                except Exception:
+                    self.app.logger.exception(f"Background task {name} failed")
+            time.sleep(seconds)
@@ -3,10 +3,74 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from flask import current_app
+from multiprocessing import get_context
+from sqlalchemy import select, update, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.certificate import Certificate, CertificateJob
 import os
 import uuid
-import json
+
+
+def render_certificate(args):
+    """Build one certificate PDF from plain values.
+
+    Module-level and free of ORM objects so a process pool can pickle it;
+    returns the certificate ID.
+    """
+    filepath, cert_id, user_name, event_title, event_date, location, category, generated_on = args
+    
+    # Create PDF
+    doc = SimpleDocTemplate(filepath, pagesize=landscape(A4))
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CertTitle', parent=styles['Title'], fontSize=36,
+        alignment=TA_CENTER, textColor=colors.blue, spaceAfter=30
+    )
+    name_style = ParagraphStyle(
+        'CertName', parent=styles['Normal'], fontSize=28,
+        alignment=TA_CENTER, textColor=colors.green, spaceAfter=20
+    )
+    content_style = ParagraphStyle(
+        'CertContent', parent=styles['Normal'], fontSize=16,
+        alignment=TA_CENTER, spaceAfter=12
+    )
+    
+    # Certificate content
+    story = []
+    story.append(Spacer(1, 50))
+    story.append(Paragraph("🏆 CERTIFICATE OF PARTICIPATION", title_style))
+    story.append(Paragraph("EVENTIFY UNIVERSITY", content_style))
+    story.append(Spacer(1, 30))
+    story.append(Paragraph("This is to certify that", content_style))
+    story.append(Paragraph(f"<u>{user_name}</u>", name_style))
+    story.append(Paragraph("has successfully participated in", content_style))
+    story.append(Paragraph(f'<b>"{event_title}"</b>', name_style))
+    story.append(Spacer(1, 20))
+    story.append(Paragraph(f"Event Date: {event_date}", content_style))
+    story.append(Paragraph(f"Location: {location}", content_style))
+    story.append(Paragraph(f"Category: {category}", content_style))
+    story.append(Spacer(1, 40))
+    story.append(Paragraph(f"Certificate ID: {cert_id}", content_style))
+    story.append(Paragraph(f"Generated: {generated_on}", content_style))
+    
+    # Build PDF
+    doc.build(story)
+    return cert_id
+
+
+def _render_or_error(args):
+    """Pool task: (certificate ID, error message or None)"""
+    try:
+        return render_certificate(args), None
+    except Exception as e:
+        return args[1], str(e)
+
 
 class CertificateGenerator:
     def __init__(self, app):
@@ -15,44 +79,38 @@ class CertificateGenerator:
         self.cert_folder = os.path.join(app.static_folder, 'certificates')
         os.makedirs(self.cert_folder, exist_ok=True)
         
-        # Certificate records (JSON file instead of database)
+        # Certificate records live in the certificates table; this file is
+        # only read by the import-certificates command
         self.records_file = os.path.join(self.cert_folder, 'certificate_records.json')
-        self._init_records_file()
-    
-    def _init_records_file(self):
-        """Initialize certificate records file"""
-        if not os.path.exists(self.records_file):
-            with open(self.records_file, 'w') as f:
-                json.dump({}, f)
-    
-    def _load_records(self):
-        """Load certificate records from JSON"""
-        try:
-            with open(self.records_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    
-    def _save_records(self, records):
-        """Save certificate records to JSON"""
-        with open(self.records_file, 'w') as f:
-            json.dump(records, f, indent=2, default=str)
     
     def _is_event_completed(self, event):
         """Check if event is completed (past end date and time)"""
-        from datetime import datetime
-        try:
-            # Combine end date and time
-            event_end = datetime.combine(event.end_date, event.end_time)
-            return event_end < datetime.now()
-        except:
-            # Fallback to start date if end date not available
-            event_start = datetime.combine(event.start_date, event.start_time)
-            return event_start < datetime.now()
+        return event.has_ended
+    
+    def _registered_events(self, user, completed):
+        """User's registered events that have (or have not) ended, from one query"""
+        from models.event import Event, event_registrations
+        now = datetime.now()
+        return Event.query.join(
+            event_registrations, event_registrations.c.event_id == Event.id
+        ).filter(
+            event_registrations.c.user_id == user.id,
+            Event.ends_at < now if completed else Event.ends_at >= now
+        ).order_by(Event.ends_at).all()
+    
+    def _render_args(self, filepath, cert_id, user, event):
+        return (
+            filepath, cert_id, user.username, event.title, event.start_date.strftime('%B %d, %Y'),
+            event.location, event.category, datetime.now().strftime('%B %d, %Y')
+        )
     
     def _is_user_registered(self, user, event):
         """Check if user is registered for the event"""
-        return user in event.registered_users
+        from viewmodels.student_viewmodel import StudentViewModel
+        return StudentViewModel.is_registered(user, event.id)
+    
+    def _find_certificate(self, user_id, event_id):
+        return Certificate.query.filter_by(user_id=user_id, event_id=event_id).first()
     
     def can_generate_certificate(self, user, event):
         """Check if certificate can be generated for user and event"""
@@ -65,15 +123,7 @@ class CertificateGenerator:
             return False, "Certificate will be available after the event ends"
         
         # Check if certificate already exists
-        records = self._load_records()
-        cert_key = f"{event.id}_{user.id}"
-        existing_cert = None
-        for cert_id, data in records.items():
-            if data.get('user_id') == user.id and data.get('event_id') == event.id:
-                existing_cert = cert_id
-                break
-        
-        if existing_cert:
+        if self._find_certificate(user.id, event.id) is not None:
             return False, "Certificate already generated"
         
         return True, "Certificate can be generated"
@@ -92,83 +142,154 @@ class CertificateGenerator:
         filename = f"{cert_id}.pdf"
         filepath = os.path.join(self.cert_folder, filename)
         
-        # Create PDF
-        doc = SimpleDocTemplate(filepath, pagesize=landscape(A4))
+        render_certificate(self._render_args(filepath, cert_id, user, event))
         
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CertTitle', parent=styles['Title'], fontSize=36,
-            alignment=TA_CENTER, textColor=colors.blue, spaceAfter=30
-        )
-        name_style = ParagraphStyle(
-            'CertName', parent=styles['Normal'], fontSize=28,
-            alignment=TA_CENTER, textColor=colors.green, spaceAfter=20
-        )
-        content_style = ParagraphStyle(
-            'CertContent', parent=styles['Normal'], fontSize=16,
-            alignment=TA_CENTER, spaceAfter=12
-        )
-        
-        # Certificate content
-        story = []
-        story.append(Spacer(1, 50))
-        story.append(Paragraph("🏆 CERTIFICATE OF PARTICIPATION", title_style))
-        story.append(Paragraph("EVENTIFY UNIVERSITY", content_style))
-        story.append(Spacer(1, 30))
-        story.append(Paragraph("This is to certify that", content_style))
-        story.append(Paragraph(f"<u>{user.username}</u>", name_style))
-        story.append(Paragraph("has successfully participated in", content_style))
-        story.append(Paragraph(f'<b>"{event.title}"</b>', name_style))
-        story.append(Spacer(1, 20))
-        story.append(Paragraph(f"Event Date: {event.start_date.strftime('%B %d, %Y')}", content_style))
-        story.append(Paragraph(f"Location: {event.location}", content_style))
-        story.append(Paragraph(f"Category: {event.category}", content_style))
-        story.append(Spacer(1, 40))
-        story.append(Paragraph(f"Certificate ID: {cert_id}", content_style))
-        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", content_style))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Save record
-        records = self._load_records()
-        records[cert_id] = {
-            'user_id': user.id,
-            'user_name': user.username,
-            'user_email': user.email,
-            'event_id': event.id,
-            'event_title': event.title,
-            'event_category': event.category,
-            'event_start_date': event.start_date.strftime('%Y-%m-%d'),
-            'event_end_date': event.end_date.strftime('%Y-%m-%d') if hasattr(event, 'end_date') else event.start_date.strftime('%Y-%m-%d'),
-            'event_location': event.location,
-            'generated_at': datetime.now().isoformat(),
-            'download_count': 0,
-            'filename': filename,
-            'is_valid': True
-        }
-        self._save_records(records)
+        # Save record; the unique (user_id, event_id) key rejects a concurrent duplicate
+        db.session.add(Certificate(
+            id=cert_id,
+            user_id=user.id,
+            user_name=user.username,
+            user_email=user.email,
+            event_id=event.id,
+            event_title=event.title,
+            event_category=event.category,
+            event_start_date=event.start_date,
+            event_end_date=event.end_date,
+            event_location=event.location,
+            generated_at=datetime.now(),
+            filename=filename
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            os.remove(filepath)
+            raise ValueError("Certificate already generated")
         
         return cert_id, filename
     
+    def create_job(self, requested_by, event_id=None, user_id=None, lease_seconds=None):
+        """Queue bulk generation for an event's attendees or a user's eligible events.
+        
+        With lease_seconds the job is created already claimed by the caller,
+        so the background runner leaves it alone.
+        """
+        job = CertificateJob(requested_by_id=requested_by.id, event_id=event_id, user_id=user_id)
+        if lease_seconds is not None:
+            job.status = CertificateJob.RUNNING
+            job.lease_until = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        db.session.add(job)
+        db.session.commit()
+        return job
+    
+    def _missing_certificates(self, job):
+        """(user, event) pairs in the job's scope: registered, event ended, no certificate yet"""
+        from models.event import Event, event_registrations
+        from models.user import User
+        query = db.session.query(User, Event).join(
+            event_registrations, event_registrations.c.user_id == User.id
+        ).join(
+            Event, Event.id == event_registrations.c.event_id
+        ).outerjoin(
+            Certificate, and_(Certificate.user_id == User.id, Certificate.event_id == Event.id)
+        ).filter(Certificate.id.is_(None), Event.ends_at < datetime.now())
+        if job.event_id is not None:
+            query = query.filter(event_registrations.c.event_id == job.event_id)
+        if job.user_id is not None:
+            query = query.filter(event_registrations.c.user_id == job.user_id)
+        return query.order_by(event_registrations.c.event_id, event_registrations.c.user_id).all()
+    
+    def run_job(self, job, workers=None, chunk_size=20, lease_seconds=600, inline=False):
+        """Render the job's missing certificates across a process pool.
+        
+        PDFs are rendered in parallel from plain argument tuples. Each chunk's
+        certificate records are inserted in the same commit as its progress,
+        so a crashed job is simply run again: it only renders what still has
+        no record, and at most one uncommitted chunk of PDFs is left behind.
+        inline renders in this process instead (CLI use only: in a web worker
+        it would block the event loop).
+        """
+        pairs = self._missing_certificates(job)
+        # Recorded certificates stay done; earlier failures are retried with the rest
+        job.failed = 0
+        job.total = job.done + len(pairs)
+        db.session.commit()
+        
+        tasks = []
+        records = {}
+        for user, event in pairs:
+            cert_id = f"CERT-{event.id}-{user.id}-{uuid.uuid4().hex[:8].upper()}"
+            filename = f"{cert_id}.pdf"
+            tasks.append(self._render_args(os.path.join(self.cert_folder, filename), cert_id, user, event))
+            records[cert_id] = {
+                'id': cert_id, 'user_id': user.id, 'user_name': user.username, 'user_email': user.email,
+                'event_id': event.id, 'event_title': event.title, 'event_category': event.category,
+                'event_start_date': event.start_date, 'event_end_date': event.end_date,
+                'event_location': event.location, 'filename': filename, 'generated_at': datetime.now(),
+                'download_count': 0, 'is_valid': True
+            }
+        
+        errors = []
+        
+        def record(results):
+            rows = [records[cert_id] for cert_id, error in results if error is None]
+            errors.extend(error for _, error in results if error is not None)
+            if rows:
+                # A single generate_certificate may have stored some pairs meanwhile; theirs wins
+                db.session.execute(
+                    sqlite_insert(Certificate.__table__).on_conflict_do_nothing(
+                        index_elements=['user_id', 'event_id']
+                    ),
+                    rows
+                )
+                stored = set(db.session.execute(
+                    select(Certificate.id).where(Certificate.id.in_([row['id'] for row in rows]))
+                ).scalars())
+                for row in rows:
+                    if row['id'] not in stored:
+                        os.remove(os.path.join(self.cert_folder, row['filename']))
+            job.done += len(rows)
+            job.failed += len(results) - len(rows)
+            job.lease_until = datetime.utcnow() + timedelta(seconds=lease_seconds)
+            db.session.commit()
+        
+        if inline:
+            for start in range(0, len(tasks), chunk_size):
+                record([_render_or_error(args) for args in tasks[start:start + chunk_size]])
+        elif tasks:
+            # spawn, not fork: a forked child would share this process's open SQLite connections
+            # No more processes than there are chunks to hand out
+            processes = min(workers or os.cpu_count() or 1, -(-len(tasks) // chunk_size))
+            with get_context('spawn').Pool(processes) as pool:
+                batch = []
+                for result in pool.imap_unordered(_render_or_error, tasks, chunk_size):
+                    batch.append(result)
+                    if len(batch) >= chunk_size:
+                        record(batch)
+                        batch = []
+                if batch:
+                    record(batch)
+        
+        job.status = CertificateJob.FAILED if errors and not job.done else CertificateJob.COMPLETED
+        job.error = '; '.join(sorted(set(errors)))[:1000] or None
+        job.lease_until = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job
+    
     def get_user_certificates(self, user_id):
         """Get all certificates for a user"""
-        records = self._load_records()
-        user_certs = []
-        for cert_id, data in records.items():
-            if data['user_id'] == user_id and data.get('is_valid', True):
-                user_certs.append({
-                    'id': cert_id,
-                    'event_id': data['event_id'],
-                    'event_title': data['event_title'],
-                    #'event_category': data['event_category'],
-                    #'event_date': data['event_start_date'],
-                    'generated_at': data['generated_at'],
-                    'download_count': data.get('download_count', 0),
-                    'filename': data['filename']
-                })
-        return sorted(user_certs, key=lambda x: x['generated_at'], reverse=True)
+        certificates = Certificate.query.filter_by(user_id=user_id, is_valid=True).order_by(
+            Certificate.generated_at.desc()
+        ).all()
+        return [{
+            'id': cert.id,
+            'event_id': cert.event_id,
+            'event_title': cert.event_title,
+            'generated_at': cert.generated_at.isoformat(),
+            'download_count': cert.download_count,
+            'filename': cert.filename
+        } for cert in certificates]
     
     def get_user_eligible_events(self, user):
         """Get events for which user can generate certificates"""
@@ -176,12 +297,13 @@ class CertificateGenerator:
         completed_cert_event_ids = []
         
         # Get already generated certificate event IDs
-        user_certs = self.get_user_certificates(user.id)
-        completed_cert_event_ids = [cert['event_id'] for cert in user_certs]
+        completed_cert_event_ids = set(db.session.execute(
+            select(Certificate.event_id).where(Certificate.user_id == user.id)
+        ).scalars())
         
         # Check registered events
-        for event in user.registered_events:
-            if event.id not in completed_cert_event_ids and self._is_event_completed(event):
+        for event in self._registered_events(user, completed=True):
+            if event.id not in completed_cert_event_ids:
                 eligible_events.append({
                     'event': event,
                     'can_generate': True,
@@ -194,30 +316,57 @@ class CertificateGenerator:
         """Get events that are registered but not yet completed"""
         pending_events = []
         
-        for event in user.registered_events:
-            if not self._is_event_completed(event):
-                pending_events.append({
-                    'event': event,
-                    'can_generate': False,
-                    'reason': f'Event will end on {event.end_date if hasattr(event, "end_date") else event.start_date}'
-                })
+        for event in self._registered_events(user, completed=False):
+            pending_events.append({
+                'event': event,
+                'can_generate': False,
+                'reason': f'Event will end on {event.end_date if hasattr(event, "end_date") else event.start_date}'
+            })
         
         return pending_events
     
     def record_download(self, cert_id):
         """Record certificate download"""
-        records = self._load_records()
-        if cert_id in records:
-            records[cert_id]['download_count'] = records[cert_id].get('download_count', 0) + 1
-            records[cert_id]['last_downloaded'] = datetime.now().isoformat()
-            self._save_records(records)
+        db.session.execute(
+            update(Certificate).where(Certificate.id == cert_id).values(
+                download_count=Certificate.download_count + 1,
+                last_downloaded_at=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
     
     def verify_certificate(self, cert_id):
         """Verify certificate"""
-        records = self._load_records()
-        if cert_id in records and records[cert_id].get('is_valid', True):
+        cert = db.session.get(Certificate, cert_id)
+        if cert is not None and cert.is_valid:
             return {
                 'valid': True,
-                'data': records[cert_id]
+                'data': cert.to_record()
             }
-        return {'valid': False}
\ No newline at end of file
+        return {'valid': False}
+
+
+def run_certificate_jobs():
+    """Run queued bulk certificate jobs; returns how many finished.
+    
+    Called from the dedicated `flask run-certificate-jobs` process: the pool
+    of spawned interpreters would stall a gevent web worker's event loop.
+    """
+    config = current_app.config
+    generator = CertificateGenerator(current_app)
+    lease = config.get('CERTIFICATE_JOB_LEASE', 600)
+    finished = 0
+    while True:
+        job = CertificateJob.claim(lease)
+        if job is None:
+            return finished
+        try:
+            generator.run_job(job, workers=config.get('CERTIFICATE_WORKERS'), lease_seconds=lease)
+        except Exception as e:
+            db.session.rollback()
+            job.status = CertificateJob.FAILED
+            job.error = str(e)[:1000]
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            current_app.logger.exception("Certificate job failed")
+        finished += 1
@@ -1,9 +1,13 @@
+from flask import current_app
 from flask_mail import Message
 from extensions import mail
+from models import db
+from models.outbox import Outbox
 
-def send_event_registration_email(to_email, event):
+def queue_event_registration_email(to_email, event):
     """
-    Send registration confirmation email with event details
+    Queue the registration confirmation email with event details.
+    Called inside the registration transaction; drain_outbox delivers it.
     """
     subject = f"Registration Confirmed: {event.title}"
     body = f"""
@@ -21,5 +25,47 @@ def send_event_registration_email(to_email, event):
     Thank you for registering!
     """
 
-    msg = Message(subject=subject, recipients=[to_email], body=body)
-    mail.send(msg)
+    Outbox.enqueue(to_email, subject, body)
+
+
+def drain_outbox(batch_size=None):
+    """
+    Deliver due outbox messages over one SMTP connection per batch.
+    Failed messages are retried with exponential backoff; returns (sent, failed).
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('MAIL_OUTBOX_BATCH_SIZE', 100)
+    retry_base = config.get('MAIL_OUTBOX_RETRY_BASE', 30)
+    max_attempts = config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 8)
+    lease = config.get('MAIL_OUTBOX_LEASE', 300)
+
+    sent = failed = 0
+    while True:
+        messages = Outbox.claim(batch_size, lease)
+        if not messages:
+            return sent, failed
+
+        handled = set()
+        try:
+            with mail.connect() as connection:
+                for message in messages:
+                    try:
+                        connection.send(Message(
+                            subject=message.subject, recipients=[message.recipient], body=message.body
+                        ))
+                        Outbox.mark_sent(message)
+                        sent += 1
+                    except Exception as e:
+                        Outbox.mark_failed(message, e, retry_base, max_attempts)
+                        failed += 1
+                    handled.add(message.id)
+        except Exception as e:
+            # Connecting (or closing) failed: retry whatever was not handled yet
+            current_app.logger.warning(f"Outbox delivery failed: {e}")
+            for message in messages:
+                if message.id not in handled:
+                    Outbox.mark_failed(message, e, retry_base, max_attempts)
+                    failed += 1
+            db.session.commit()
+            return sent, failed
+        db.session.commit()
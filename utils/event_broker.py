@@ -0,0 +1,99 @@
+from importlib import import_module
+import threading
+
+
+class Subscription:
+    """Pending updates of one stream client, coalesced per event.
+
+    Only the latest payload of each event is kept, so a slow client holds at
+    most one message per subscribed event and never an unbounded backlog.
+    """
+
+    def __init__(self, event_ids):
+        self.event_ids = frozenset(event_ids)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def deliver(self, event_id, payload):
+        with self._lock:
+            self._pending[event_id] = payload
+        self._ready.set()
+
+    def get(self, timeout=None):
+        """Wait up to timeout seconds; returns {event_id: payload} (empty on timeout)"""
+        self._ready.wait(timeout)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._ready.clear()
+        return pending
+
+
+class LocalBackend:
+    """Delivers publishes to subscribers of this process only.
+
+    A cross-worker backend (Redis pub/sub, Postgres LISTEN/NOTIFY) implements
+    the same two methods: ``start`` receives the broker's fan-out callable
+    and feeds it messages from the other workers, ``publish`` sends a
+    message to every worker including this one.
+    """
+
+    def __init__(self, app=None):
+        self._fan_out = None
+
+    def start(self, fan_out):
+        self._fan_out = fan_out
+
+    def publish(self, event_id, payload):
+        self._fan_out(event_id, payload)
+
+
+class EventBroker:
+    """Publish/subscribe hub for live event updates (registration counts, status).
+
+    Subscribers are plain objects waiting on a threading.Event, so under the
+    gevent worker thousands of idle streams cost a greenlet each rather than
+    an OS thread.
+    """
+
+    def __init__(self, backend=None):
+        self._topics = {}
+        self._lock = threading.Lock()
+        self.backend = backend or LocalBackend()
+        self.backend.start(self._fan_out)
+
+    def init_app(self, app):
+        backend = app.config.get('EVENT_BROKER_BACKEND')
+        if backend:
+            module_name, _, class_name = backend.rpartition('.')
+            self.backend = getattr(import_module(module_name), class_name)(app)
+            self.backend.start(self._fan_out)
+
+    def subscribe(self, event_ids):
+        subscription = Subscription(event_ids)
+        with self._lock:
+            for event_id in subscription.event_ids:
+                self._topics.setdefault(event_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for event_id in subscription.event_ids:
+                subscribers = self._topics.get(event_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[event_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+    def publish(self, event_id, payload):
+        self.backend.publish(event_id, payload)
+
+    def _fan_out(self, event_id, payload):
+        with self._lock:
+            subscribers = list(self._topics.get(event_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event_id, payload)
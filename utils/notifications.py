@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from flask_mail import Message
+from extensions import mail
+from models.notification import Notifications
+from models.outbox import Outbox
+
+def event_change_message(event, changes):
+    """
+    Subject and body telling attendees what changed; changes maps a field
+    label to its (old, new) values.
+    """
+    subject = f"Event Updated: {event.title}"
+    lines = '\n'.join(f"    {label}: {old} -> {new}" for label, (old, new) in changes.items())
+    body = f"""
+    Hi,
+
+    An event you registered for has changed: {event.title}
+
+    What changed:
+{lines}
+
+    Location: {event.location}
+    Start: {event.start_date.strftime('%B %d, %Y')}, {event.start_time.strftime('%I:%M %p')}
+    End: {event.end_date.strftime('%B %d, %Y')}, {event.end_time.strftime('%I:%M %p')}
+    """
+    return subject, body
+
+
+def event_cancellation_message(event):
+    subject = f"Event Cancelled: {event.title}"
+    body = f"""
+    Hi,
+
+    The event you registered for has been cancelled: {event.title}
+
+    It was scheduled for {event.start_date.strftime('%B %d, %Y')}, {event.start_time.strftime('%I:%M %p')}
+    at {event.location}. Your registration has been removed.
+
+    We are sorry for the inconvenience.
+    """
+    return subject, body
+
+
+def event_reminder_message(event, offset_minutes):
+    if offset_minutes % 60:
+        lead = f"{offset_minutes} minutes"
+    else:
+        hours = offset_minutes // 60
+        lead = f"{hours} hour" if hours == 1 else f"{hours} hours"
+    subject = f"Reminder: {event.title} starts in {lead}"
+    body = f"""
+    Hi,
+
+    This is a reminder that {event.title} starts in {lead}.
+
+    Start: {event.start_date.strftime('%B %d, %Y')}, {event.start_time.strftime('%I:%M %p')}
+    Location: {event.location}
+
+    See you there!
+    """
+    return subject, body
+
+
+def _send_slice(app, recipients, subject, body):
+    """Send one message per recipient over a single SMTP connection; returns the failed ones"""
+    failed = []
+    attempted = 0
+    with app.app_context():
+        try:
+            with mail.connect() as connection:
+                for user_id, email in recipients:
+                    try:
+                        connection.send(Message(subject=subject, recipients=[email], body=body))
+                    except Exception:
+                        failed.append((user_id, email))
+                    attempted += 1
+        except Exception as e:
+            # The connection failed: nobody after the last attempt got the message
+            app.logger.warning(f"Notification SMTP connection failed: {e}")
+            failed += recipients[attempted:]
+    return failed
+
+
+def deliver_notifications():
+    """
+    Work through unfinished notification runs: chunks of recipients are sent
+    in parallel over NOTIFICATION_SMTP_CONNECTIONS connections, and progress
+    is committed per chunk. Failed recipients go to the email outbox.
+    Returns the number of runs completed.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    chunk_size = config.get('NOTIFICATION_CHUNK_SIZE', 500)
+    connections = config.get('NOTIFICATION_SMTP_CONNECTIONS', 4)
+    lease = config.get('NOTIFICATION_LEASE', 120)
+
+    completed = 0
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        while True:
+            run = Notifications.claim(lease)
+            if run is None:
+                return completed
+            while True:
+                recipients = Notifications.next_recipients(run, chunk_size)
+                if not recipients:
+                    break
+                slices = [recipients[i::connections] for i in range(connections) if recipients[i::connections]]
+                failed = [r for result in pool.map(
+                    lambda part: _send_slice(app, part, run.subject, run.body), slices
+                ) for r in result]
+                for user_id, email in failed:
+                    Outbox.enqueue(email, run.subject, run.body)
+                Notifications.record_chunk(
+                    run, recipients[-1].user_id, len(recipients) - len(failed), len(failed), lease
+                )
+            Notifications.finish(run)
+            completed += 1
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import date, time
+from flask import jsonify, render_template
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 12
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Opaque URL-safe cursor for a row's sort key"""
+    payload = json.dumps([v.isoformat() if isinstance(v, (date, time)) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Sort key values from a cursor, converted back to the columns' Python types"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return tuple(_from_json(value, column) for value, column in zip(values, columns))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _from_json(value, column):
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+class Page:
+    """One page of results plus the cursor of the next one (None on the last page)"""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def map(self, func):
+        return Page([func(item) for item in self.items], self.next_cursor)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+class Keyset:
+    """Seek pagination over a unique, totally ordered column tuple.
+
+    Each page continues strictly after the last row's key, so a page costs
+    an index range scan of ``per_page + 1`` rows however deep it is, and
+    concurrent inserts never shift or repeat rows between pages.
+    """
+
+    def __init__(self, *columns, descending=False):
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self):
+        return [c.desc() if self.descending else c.asc() for c in self.columns]
+
+    def page(self, query, key, cursor=None, per_page=DEFAULT_PER_PAGE):
+        """Run query for the page after cursor; key(row) returns a row's sort key"""
+        if cursor:
+            after = decode_cursor(cursor, self.columns)
+            bound = tuple_(*self.columns)
+            query = query.filter(bound < tuple_(*after) if self.descending else bound > tuple_(*after))
+        query = query.order_by(*self.order_by())
+        if per_page is None:
+            return Page(query.all())
+
+        rows = query.limit(per_page + 1).all()
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            return Page(rows, encode_cursor(key(rows[-1])))
+        return Page(rows)
+
+
+def json_page(page, template, **context):
+    """Response for a "load more" request: the page's rendered rows and the next cursor"""
+    return jsonify({
+        'html': render_template(template, **context),
+        'next_cursor': page.next_cursor
+    })
@@ -0,0 +1,55 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    """Fails any request that issues more SQL statements than allowed.
+
+    Meant for tests and local runs: set SQL_STATEMENT_BUDGET (and optionally
+    per-endpoint SQL_STATEMENT_BUDGETS) and an N+1 regression on a list page
+    turns into an AssertionError naming the endpoint and its statements.
+    Disabled when no budget is configured.
+    """
+
+    def __init__(self, budget=None, endpoint_budgets=None):
+        self.budget = budget
+        self.endpoint_budgets = endpoint_budgets or {}
+        self._listening = False
+
+    def init_app(self, app):
+        self.budget = app.config.get('SQL_STATEMENT_BUDGET', self.budget)
+        self.endpoint_budgets = app.config.get('SQL_STATEMENT_BUDGETS', self.endpoint_budgets)
+        if not self.budget and not self.endpoint_budgets:
+            return
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._count)
+            self._listening = True
+        # Hook each app once, however often init_app runs on this shared instance
+        if 'query_budget' not in app.extensions:
+            app.extensions['query_budget'] = self
+            app.before_request(self._start)
+            app.after_request(self._check)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            statements = g.get('sql_statements')
+            if statements is not None:
+                statements.append(statement)
+
+    def _start(self):
+        g.sql_statements = []
+
+    def _check(self, response):
+        statements = g.pop('sql_statements', None)
+        budget = self.endpoint_budgets.get(request.endpoint, self.budget)
+        if statements is not None and budget and len(statements) > budget:
+            raise QueryBudgetExceeded(
+                f"{request.endpoint} issued {len(statements)} SQL statements (budget {budget}):\n"
+                + '\n'.join(statements)
+            )
+        return response
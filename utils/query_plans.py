@@ -0,0 +1,109 @@
+import re
+from datetime import date
+from sqlalchemy import event as sa_event
+from werkzeug.exceptions import NotFound
+from models import db
+from models.event import Event
+from models.user import User
+from models.waitlist import Waitlist
+from models.reccomendation_engine import RecommendationEngine
+from viewmodels.student_viewmodel import StudentViewModel
+from viewmodels.admin_viewmodel import AdminViewModel
+
+_SCAN = re.compile(r'^SCAN (\S+)(.*)$')
+_SUBQUERY = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\S+)')
+
+
+def _hot_queries(student, admin, event_id, category):
+    """The read paths behind the student/admin pages and the recommender, by label"""
+    return [
+        ('student.upcoming_events', lambda: StudentViewModel.get_upcoming_events()),
+        ('student.events_by_category', lambda: StudentViewModel.get_events_by_category(category)),
+        ('student.today_events', lambda: StudentViewModel.get_today_events()),
+        ('student.ongoing_events', lambda: StudentViewModel.get_ongoing_events()),
+        ('student.is_registered', lambda: StudentViewModel.is_registered(student, event_id)),
+        ('student.registered_events', lambda: StudentViewModel.get_user_upcoming_registered_events(student)),
+        ('student.past_registered_events', lambda: StudentViewModel.get_user_past_registered_events(student)),
+        ('student.dashboard_stats', lambda: StudentViewModel.get_dashboard_stats(student)),
+        ('student.precomputed_recommendations',
+         lambda: StudentViewModel._get_precomputed_recommendations(student, 5)),
+        ('student.search', lambda: StudentViewModel.search_event_results('event', category)),
+        ('student.waitlist_position', lambda: Waitlist.position(student.id, event_id)),
+        ('engine.content', lambda: RecommendationEngine._content_based_filtering(student, 10)),
+        ('engine.collaborative', lambda: RecommendationEngine._collaborative_filtering(student, 10)),
+        ('engine.popularity', lambda: RecommendationEngine._popularity_based_filtering(student, 10)),
+        ('engine.trending', lambda: RecommendationEngine.get_trending_events(10)),
+        ('admin.events', lambda: AdminViewModel.get_admin_events(admin)),
+        ('admin.stats', lambda: AdminViewModel.get_admin_stats(admin)),
+        ('admin.attendees', lambda: list(AdminViewModel.get_event_attendees(event_id))),
+    ]
+
+
+def _sample_arguments():
+    student = User.query.filter_by(role='student').first() or User(id=0, role='student')
+    admin = User.query.filter_by(role='admin').first() or User(id=0, role='admin')
+    event = Event.query.filter(Event.start_date >= date.today()).first() or Event.query.first()
+    if event is None:
+        return student, admin, 0, 'Technical'
+    return student, admin, event.id, event.category
+
+
+def _capture_selects(func):
+    """Run func and return the distinct SELECT statements it issued, with parameters"""
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(statement, parameters)
+
+    sa_event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        func()
+    except NotFound:
+        # Empty database: the lookup itself is still checked
+        pass
+    finally:
+        sa_event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def full_scans(plan, limited=False):
+    """Tables read end to end in an EXPLAIN QUERY PLAN result.
+
+    A SCAN through an index only walks the whole table when nothing stops
+    it early, so it is accepted for statements with a LIMIT (top-N by an
+    indexed column) and reported otherwise.
+    """
+    subqueries = set()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        match = _SUBQUERY.match(detail)
+        if match:
+            subqueries.add(match.group(1))
+            continue
+        match = _SCAN.match(detail)
+        if match and 'VIRTUAL TABLE INDEX' not in match.group(2) and not (limited and 'INDEX' in match.group(2)):
+            table = match.group(1)
+            if table != 'CONSTANT' and table not in subqueries:
+                scans.append(table)
+    return scans
+
+
+def check_query_plans():
+    """EXPLAIN every statement of the hot read paths.
+
+    Yields (label, sql, plan rows, fully scanned tables) per statement. The
+    read paths do not write (users without a preference profile get a
+    transient one), so the closing rollback only ends the read transaction.
+    """
+    try:
+        for label, func in _hot_queries(*_sample_arguments()):
+            for statement, parameters in _capture_selects(func).items():
+                plan = db.session.connection().exec_driver_sql(
+                    'EXPLAIN QUERY PLAN ' + statement, parameters
+                ).all()
+                limited = ' LIMIT ' in statement.upper()
+                yield label, statement, plan, full_scans(plan, limited)
+    finally:
+        db.session.rollback()
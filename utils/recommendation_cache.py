@@ -0,0 +1,106 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class RecommendationCache:
+    """Bounded LRU cache of scored recommendation lists with a TTL.
+
+    Entries are keyed by (user_id, limit) and store plain
+    ``(event_id, score, reason)`` tuples rather than ORM objects, so they
+    can outlive the request session. A reverse index from event id to keys
+    lets an event change drop only the lists that contain that event.
+    Invalidation is per process; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, max_entries=2048, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_event = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RECOMMENDATION_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('RECOMMENDATION_CACHE_TTL', self.ttl)
+
+    def get(self, user_id, limit):
+        """Cached (event_id, score, reason) tuples, or None on a miss"""
+        key = (user_id, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, items = entry
+            if expires_at <= time.monotonic():
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return items
+
+    def set(self, user_id, limit, items):
+        key = (user_id, limit)
+        items = tuple(items)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, items)
+            for event_id, _, _ in items:
+                self._keys_by_event.setdefault(event_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached list of a user"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                self._discard(key)
+                self.invalidations += 1
+
+    def invalidate_event(self, event_id):
+        """Drop every cached list that contains the event"""
+        with self._lock:
+            for key in list(self._keys_by_event.get(event_id, ())):
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_event.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for event_id, _, _ in entry[1]:
+            keys = self._keys_by_event.get(event_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_event[event_id]
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import heapq
+import threading
+from flask import current_app
+from models import db
+from models.event import Event
+from models.notification import Notifications
+from models.reminder import ReminderDispatch
+
+
+class ReminderScheduler:
+    """Heap of the reminders due in the next window, fired by a periodic tick.
+
+    Only events starting within the window plus the largest offset are
+    loaded, from a range scan of the (status, starts_at) index. The heap is
+    rebuilt when the window runs out or after invalidate() (an event was
+    created or rescheduled in this worker). Every worker runs its own heap;
+    a unique reminder_dispatches row decides which one sends each reminder,
+    and sending means handing a notification run to the fan-out sender.
+    """
+
+    def __init__(self, offsets_minutes=(24 * 60, 60), window=3600, grace=900):
+        self.offsets_minutes = offsets_minutes
+        self.window = window
+        self.grace = grace
+        self._heap = []
+        self._loaded_until = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.offsets_minutes = app.config.get('REMINDER_OFFSETS_MINUTES', self.offsets_minutes)
+        self.window = app.config.get('REMINDER_WINDOW', self.window)
+        self.grace = app.config.get('REMINDER_GRACE', self.grace)
+
+    def invalidate(self):
+        """Reload the heap on the next tick (an event start time changed)"""
+        with self._lock:
+            self._loaded_until = None
+
+    def tick(self, now=None):
+        """Send every reminder that is due; returns how many this worker dispatched"""
+        now = now or datetime.now()
+        with self._lock:
+            if self._loaded_until is None or now >= self._loaded_until:
+                self._load(now)
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+        dispatched = 0
+        for entry in due:
+            due_at, event_id, offset, starts_at = entry
+            try:
+                dispatched += bool(self._dispatch(event_id, offset, starts_at))
+            except Exception:
+                current_app.logger.exception(f"Reminder for event {event_id} failed")
+                # Retried on the next tick until it is older than the grace period
+                if now - due_at < timedelta(seconds=self.grace):
+                    with self._lock:
+                        heapq.heappush(self._heap, entry)
+        return dispatched
+
+    def _load(self, now):
+        window_end = now + timedelta(seconds=self.window)
+        latest_start = window_end + timedelta(minutes=max(self.offsets_minutes))
+        rows = db.session.execute(
+            db.select(Event.id, Event.starts_at).where(
+                Event.status == Event.SCHEDULED,
+                Event.starts_at > now,
+                Event.starts_at <= latest_start,
+                Event.registration_count > 0
+            )
+        ).all()
+        heap = []
+        for event_id, starts_at in rows:
+            for offset in self.offsets_minutes:
+                due_at = starts_at - timedelta(minutes=offset)
+                # Too late for this offset (e.g. the event was moved closer); a smaller one covers it
+                if now - timedelta(seconds=self.grace) <= due_at <= window_end:
+                    heap.append((due_at, event_id, offset, starts_at))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._loaded_until = window_end
+
+    def _dispatch(self, event_id, offset_minutes, starts_at):
+        from utils.notifications import event_reminder_message
+        event = db.session.get(Event, event_id)
+        # Rescheduled or deleted since the heap was loaded; the reload has the new time
+        if event is None or event.starts_at != starts_at or not event.registration_count:
+            return False
+        try:
+            dispatch = ReminderDispatch.acquire(event_id, offset_minutes, starts_at)
+            if dispatch is None:
+                return False
+            subject, body = event_reminder_message(event, offset_minutes)
+            run = Notifications.create_run(event, 'reminder', subject, body, event.creator_id)
+            dispatch.run_id = run.id
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            raise
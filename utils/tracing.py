@@ -0,0 +1,141 @@
+from contextvars import ContextVar
+import json
+import logging
+import random
+import time
+
+logger = logging.getLogger('eventify.tracing')
+
+_current_span = ContextVar('eventify_current_span', default=None)
+
+
+class Span:
+    """Timed section of a trace with free-form attributes (candidate counts etc.)"""
+    __slots__ = ('name', 'attrs', 'started', 'duration_ms', '_token')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = 0.0
+        self.duration_ms = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        return False
+
+
+class Trace:
+    """One sampled pipeline run; sent to the sink when finished"""
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.started = time.perf_counter()
+
+    def span(self, name, **attrs):
+        span = Span(name, attrs)
+        self.spans.append(span)
+        return span
+
+    def finish(self, **attrs):
+        self.attrs.update(attrs)
+        record = {
+            'trace': self.name,
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'attrs': self.attrs,
+            'spans': [{
+                'name': span.name,
+                'duration_ms': round(span.duration_ms, 3) if span.duration_ms is not None else None,
+                'attrs': span.attrs
+            } for span in self.spans]
+        }
+        try:
+            self.tracer.sink(record)
+        except Exception:
+            logger.exception("Trace sink failed")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _NoopTrace:
+    __slots__ = ()
+
+    def span(self, name, **attrs):
+        return NOOP_SPAN
+
+    def finish(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+NOOP_TRACE = _NoopTrace()
+
+
+def logging_sink(record):
+    logger.info(json.dumps(record, default=str))
+
+
+class MemorySink:
+    """Keeps finished traces in a list; handy in a shell or benchmark"""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+
+class Tracer:
+    """Sampled tracer for the recommendation pipeline.
+
+    When the sample rate is 0 (the default) ``start`` returns a shared no-op
+    trace, so instrumented code pays one attribute check and nothing else.
+    """
+
+    def __init__(self, sample_rate=0.0, sink=logging_sink):
+        self.sample_rate = sample_rate
+        self.sink = sink
+
+    def init_app(self, app):
+        self.sample_rate = app.config.get('RECOMMENDER_TRACE_SAMPLE_RATE', self.sample_rate)
+        sink = app.config.get('RECOMMENDER_TRACE_SINK')
+        if callable(sink):
+            self.sink = sink
+
+    def start(self, name, **attrs):
+        rate = self.sample_rate
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return NOOP_TRACE
+        return Trace(self, name, attrs)
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost active span, if this run is sampled"""
+    span = _current_span.get()
+    if span is not None:
+        span.attrs.update(attrs)
@@ -1,6 +1,22 @@
 from models.event import Event
+from models.event_similarity import EventSimilarityIndex
+from models.user_recommendation import UserRecommendation
+from models.trending import TrendingIndex
+from models.user_profile import UserPreferenceProfile
+from models.waitlist import Waitlist
+from models.notification import Notifications
+from models.certificate import CertificateJob
+from models.event_search import EventSearch, EVENT_KEYSET_DESC, event_key
+from flask import current_app
+from viewmodels.loading import EVENT_LIST
+from viewmodels.stats_viewmodel import StatsViewModel
+from models.event import event_registrations
+from sqlalchemy import select
 from models import db
+from extensions import recommendation_cache, reminder_scheduler
+from utils.notifications import event_change_message, event_cancellation_message
 from datetime import datetime, date
+from viewmodels.student_viewmodel import StudentViewModel
 
 class AdminViewModel:
     @staticmethod
@@ -32,6 +48,7 @@ class AdminViewModel:
 
             db.session.add(event)
             db.session.commit()
+            reminder_scheduler.invalidate()
             return True, "Event created successfully"
 
         except Exception as e:
@@ -41,9 +58,12 @@ class AdminViewModel:
 
     
     @staticmethod
-    def get_admin_events(admin_user):
-        """Get events created by admin"""
-        return Event.query.filter_by(creator=admin_user).order_by(Event.start_date.desc()).all()
+    def get_admin_events(admin_user, cursor=None, per_page=None):
+        """Get a page of events created by admin, latest first"""
+        return EVENT_KEYSET_DESC.page(
+            Event.query.filter_by(creator=admin_user), event_key,
+            cursor, per_page or current_app.config.get('EVENTS_PER_PAGE', 12)
+        )
     
     @staticmethod
     def update_event(event_id, title, description, start_date, start_time, end_date, end_time, location, category, max_capacity,images,documents):
@@ -55,6 +75,12 @@ class AdminViewModel:
             end_time   = datetime.strptime(end_time, "%H:%M").time() if isinstance(end_time, str) else end_time
 
             event = Event.query.get_or_404(event_id)
+            preferences_changed = event.category != category or event.location != location
+            capacity_raised = max_capacity > event.max_capacity
+            changes = AdminViewModel._attendee_visible_changes(
+                event, title, start_date, start_time, end_date, end_time, location
+            )
+            schedule_changed = 'Start date' in changes or 'Start time' in changes
             
             event.title = title
             event.description = description
@@ -69,46 +95,124 @@ class AdminViewModel:
             event.images = images
             event.documents = documents
             
+            if preferences_changed:
+                db.session.flush()
+                UserPreferenceProfile.rebuild_attendees(event.id)
+                # Batch rows scored this event by its old category/location
+                UserRecommendation.query.filter_by(event_id=event.id).delete()
+            
+            promoted = []
+            if capacity_raised:
+                db.session.flush()
+                promoted = StudentViewModel.promote_waitlist(event)
+            
+            # Attendees hear about it from the notification worker, not this request
+            if changes and event.registration_count:
+                subject, body = event_change_message(event, changes)
+                Notifications.create_run(event, 'updated', subject, body, event.creator_id)
             
             db.session.commit()
+            recommendation_cache.invalidate_event(event_id)
+            if schedule_changed:
+                reminder_scheduler.invalidate()
+            StudentViewModel.publish_statuses([event_id])
+            StudentViewModel.notify_promoted(promoted, event)
             
             return True, "Event updated successfully"
         except Exception as e:
             db.session.rollback()
             return False, f"Event update failed: {str(e)}"
     
+    @staticmethod
+    def _attendee_visible_changes(event, title, start_date, start_time, end_date, end_time, location):
+        """{label: (old, new)} of the fields attendees are notified about"""
+        fields = [
+            ('Title', event.title, title),
+            ('Start date', event.start_date, start_date),
+            ('Start time', event.start_time, start_time),
+            ('End date', event.end_date, end_date),
+            ('End time', event.end_time, end_time),
+            ('Location', event.location, location),
+        ]
+        return {label: (old, new) for label, old, new in fields if old != new}
+    
     @staticmethod
     def delete_event(event_id):
         """Delete an event"""
         try:
             event = Event.query.get_or_404(event_id)
+            EventSimilarityIndex.remove_event(event.id)
+            UserRecommendation.query.filter_by(event_id=event.id).delete()
+            TrendingIndex.remove_event(event.id)
+            Waitlist.remove_event(event.id)
+            if event.registration_count:
+                subject, body = event_cancellation_message(event)
+                Notifications.create_run(event, 'cancelled', subject, body, event.creator_id)
+            attendee_ids = db.session.execute(
+                select(event_registrations.c.user_id).where(event_registrations.c.event_id == event.id)
+            ).scalars().all()
             db.session.delete(event)
+            db.session.flush()
+            UserPreferenceProfile.rebuild_many(attendee_ids)
             db.session.commit()
+            recommendation_cache.invalidate_event(event_id)
             
             return True, "Event deleted successfully"
         except Exception as e:
             db.session.rollback()
             return False, f"Event deletion failed: {str(e)}"
     
+    @staticmethod
+    def get_notification_runs(admin_user):
+        """Recent attendee notification runs of the admin's events, newest first"""
+        return Notifications.runs_by(admin_user.id)
+    
+    @staticmethod
+    def queue_event_certificates(event, admin_user):
+        """Start a bulk certificate job for an ended event (a running one is reused)"""
+        if not event.has_ended:
+            return False, "Certificates can only be generated after the event has ended"
+        if not event.registration_count:
+            return False, "This event has no participants"
+        job = CertificateJob.latest(event_id=event.id)
+        if job is not None and not job.finished:
+            return True, "Certificate generation is already in progress"
+        try:
+            from utils.certificate_generator import CertificateGenerator
+            CertificateGenerator(current_app).create_job(admin_user, event_id=event.id)
+            return True, f"Generating certificates for {event.registration_count} participants"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Could not start certificate generation: {str(e)}"
+    
     @staticmethod
     def get_event_attendees(event_id):
         """Get list of attendees for an event"""
         event = Event.query.get_or_404(event_id)
         return event.registered_users
     
+    @staticmethod
+    def search_events(search_query=None, category=None, start_date=None, end_date=None, location=None, start_time=None,
+                      cursor=None, per_page=None):
+        """Page of full-text search results over all events as (event, highlighted snippet) pairs"""
+        filters = []
+        if category and category != 'all':
+            filters.append(Event.category == category)
+        if start_date:
+            filters.append(Event.start_date >= start_date)
+        if end_date:
+            filters.append(Event.end_date <= end_date)
+        if location:
+            filters.append(Event.location.ilike(f'%{location}%'))
+        if start_time:
+            filters.append(Event.start_time.ilike(f'%{start_time}%'))
+        return EventSearch.search(
+            search_query, filters, keyset=EVENT_KEYSET_DESC, cursor=cursor,
+            per_page=per_page or current_app.config.get('EVENTS_PER_PAGE', 12),
+            options=EVENT_LIST
+        )
+    
     @staticmethod
     def get_admin_stats(admin_user):
         """Get admin dashboard statistics"""
-        events = Event.query.filter_by(creator=admin_user).all()
-        total_events = len(events)
-        
-        upcoming_events = [e for e in events if e.start_date >= date.today()]
-        total_upcoming = len(upcoming_events)
-        
-        total_attendees = sum(e.registration_count for e in events)
-        
-        return {
-            'total_events': total_events,
-            'upcoming_events': total_upcoming,
-            'total_attendees': total_attendees
-        }
\ No newline at end of file
+        return StatsViewModel.admin_stats(admin_user)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy.orm import selectinload, joinedload
+from models.event import Event
+
+# Relationship loading policies for the event pages. Pages that render each
+# event's creator (search results) batch the creators of the whole page into
+# one SELECT ... IN; a detail page joins its creator into the event query.
+# Attendee counts always come from events.registration_count, never from the
+# registered_users collection, so no policy loads it.
+EVENT_LIST = (
+    selectinload(Event.creator),
+)
+
+EVENT_DETAIL = (
+    joinedload(Event.creator),
+)
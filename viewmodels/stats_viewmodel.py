@@ -0,0 +1,58 @@
+from models.event import Event, event_registrations
+from models.user_profile import UserPreferenceProfile
+from models import db
+from datetime import date, timedelta
+from sqlalchemy import func, case, and_
+
+
+class StatsViewModel:
+    """Dashboard figures computed with one aggregate query each.
+
+    Counts come from SQL aggregates over indexed columns (events.creator_id,
+    the event_registrations primary key) and the maintained
+    events.registration_count and preference profile rows, so neither
+    dashboard loads events or attendees to count them.
+    """
+
+    @staticmethod
+    def _month_bounds(today):
+        month_start = today.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return month_start, next_month
+
+    @staticmethod
+    def admin_stats(admin_user):
+        """Totals over the events an admin created"""
+        today = date.today()
+        total_events, upcoming_events, total_attendees = db.session.query(
+            func.count(Event.id),
+            func.count(case((Event.start_date >= today, 1))),
+            func.coalesce(func.sum(Event.registration_count), 0)
+        ).filter(Event.creator_id == admin_user.id).one()
+
+        return {
+            'total_events': total_events,
+            'upcoming_events': upcoming_events,
+            'total_attendees': total_attendees
+        }
+
+    @staticmethod
+    def student_stats(user):
+        """Registration totals of a student; per-category counts come from their profile"""
+        profile = UserPreferenceProfile.load(user.id)
+        today = date.today()
+        month_start, next_month = StatsViewModel._month_bounds(today)
+
+        upcoming, this_month = db.session.query(
+            func.count(case((Event.start_date >= today, 1))),
+            func.count(case((and_(Event.start_date >= month_start, Event.start_date < next_month), 1)))
+        ).join(
+            event_registrations, event_registrations.c.event_id == Event.id
+        ).filter(event_registrations.c.user_id == user.id).one()
+
+        return {
+            'total_registered': profile.total_registrations,
+            'upcoming_events': upcoming,
+            'events_this_month': this_month,
+            'categories': dict(profile.category_counts)
+        }
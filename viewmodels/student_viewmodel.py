@@ -1,23 +1,51 @@
-from models.event import Event
+from models.event import Event, event_registrations
 from models.user import User
 from models import db
-from datetime import datetime, date
-from sqlalchemy import or_, and_
+from datetime import datetime, date, timedelta
+from sqlalchemy import or_, and_, select, update
+from flask import current_app
 # Fix the import - use the correct module name
 from models import reccomendation_engine
-from utils.email_utils import send_event_registration_email
+from models.event_similarity import EventSimilarityIndex
+from models.user_recommendation import UserRecommendation
+from models.trending import TrendingIndex
+from models import minhash_index
+from models.user_profile import UserPreferenceProfile
+from models.waitlist import Waitlist
+from models.event_search import EventSearch, EVENT_KEYSET, event_key
+from viewmodels.loading import EVENT_LIST, EVENT_DETAIL
+from viewmodels.stats_viewmodel import StatsViewModel
+from utils.email_utils import queue_event_registration_email
+from extensions import recommendation_cache, event_broker
 
 class StudentViewModel:
     @staticmethod
-    def get_upcoming_events():
-        """Get all upcoming events"""
+    def _per_page(per_page):
+        return per_page or current_app.config.get('EVENTS_PER_PAGE', 12)
+    
+    @staticmethod
+    def get_upcoming_events(cursor=None, per_page=None):
+        """Get a page of upcoming events"""
         today = date.today()
-        return Event.query.filter(Event.start_date >= today).order_by(Event.start_date, Event.start_time).all()
+        return EVENT_KEYSET.page(
+            Event.query.filter(Event.start_date >= today), event_key,
+            cursor, StudentViewModel._per_page(per_page)
+        )
     
     @staticmethod
     def get_event_by_id(event_id):
         """Get event by ID"""
-        return Event.query.get_or_404(event_id)
+        return Event.query.options(*EVENT_DETAIL).filter_by(id=event_id).first_or_404()
+    
+    @staticmethod
+    def is_registered(user, event_id):
+        """Point lookup on event_registrations (no attendee list load)"""
+        return db.session.execute(
+            select(event_registrations.c.user_id).where(
+                event_registrations.c.user_id == user.id,
+                event_registrations.c.event_id == event_id
+            )
+        ).first() is not None
     
     @staticmethod
     def register_for_event(user, event_id):
@@ -26,188 +54,393 @@ class StudentViewModel:
             event = Event.query.get_or_404(event_id)
             
             # Check if already registered
-            if user in event.registered_users:
+            if StudentViewModel.is_registered(user, event.id):
                 return False, "Already registered for this event"
             
-            # Check if event is full
-            if event.is_full:
-                return False, "Event is full"
-            
             # Check if event is in the past
             if event.is_past:
                 return False, "Cannot register for past events"
             
+            # Claim a seat atomically; concurrent signups cannot oversell capacity
+            if not StudentViewModel._claim_seat(event.id):
+                db.session.rollback()
+                return False, "Event is full"
+            
             # Register user
-            event.registered_users.append(user)
+            StudentViewModel._admit(user, event)
+            Waitlist.leave(user.id, event.id)
             db.session.commit()
-            
-            # Send confirmation email after successful registration
-            send_event_registration_email(user.email, event)
+            StudentViewModel.publish_statuses([event.id])
+            StudentViewModel._after_admission(user, event)
             
             return True, "Successfully registered for the event"
         except Exception as e:
             db.session.rollback()
             return False, f"Registration failed: {str(e)}"
     
+    @staticmethod
+    def _claim_seat(event_id):
+        """Conditionally take one seat; False when the event is already full"""
+        return db.session.execute(
+            update(Event).where(
+                Event.id == event_id,
+                Event.registration_count < Event.max_capacity
+            ).values(
+                registration_count=Event.registration_count + 1
+            ).execution_options(synchronize_session=False)
+        ).rowcount > 0
+    
+    @staticmethod
+    def _release_seat(event_id):
+        db.session.execute(
+            update(Event).where(
+                Event.id == event_id,
+                Event.registration_count > 0
+            ).values(
+                registration_count=Event.registration_count - 1
+            ).execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def _admit(user, event):
+        """Write a registration, its index updates and confirmation email for an already claimed seat"""
+        user_id = user.id
+        profile = UserPreferenceProfile.get_or_build(user_id)
+        # One timestamp: unregistration finds the trending bucket from the stored registered_at
+        registered_at = datetime.utcnow()
+        db.session.execute(event_registrations.insert().values(
+            user_id=user_id, event_id=event.id, registered_at=registered_at
+        ))
+        profile.record_registration(event)
+        EventSimilarityIndex.record_registration(user_id, event.id)
+        TrendingIndex.record_registration(
+            event.id, registered_at=registered_at,
+            half_life_hours=current_app.config.get('TRENDING_HALF_LIFE_HOURS', 24)
+        )
+        UserRecommendation.query.filter_by(user_id=user_id).delete()
+        # Delivered by the outbox drain once this transaction commits
+        queue_event_registration_email(user.email, event)
+    
+    @staticmethod
+    def _after_admission(user, event):
+        """Post-commit side effects of a registration"""
+        recommendation_cache.invalidate_user(user.id)
+        minhash_index.record_registration(user.id, event.id)
+    
+    @staticmethod
+    def promote_waitlist(event):
+        """Move waitlisted students into free seats in FIFO order (caller commits).
+        
+        Returns the promoted users so the caller can run _after_admission once
+        the transaction is committed.
+        """
+        promoted = []
+        if event.is_past:
+            return promoted
+        seat_claimed = False
+        while seat_claimed or StudentViewModel._claim_seat(event.id):
+            user_id = Waitlist.pop(event.id)
+            if user_id is None:
+                StudentViewModel._release_seat(event.id)
+                break
+            user = db.session.get(User, user_id)
+            # Account deleted, or registered directly in the meantime; the seat goes to the next in line
+            seat_claimed = user is None or StudentViewModel.is_registered(user, event.id)
+            if not seat_claimed:
+                StudentViewModel._admit(user, event)
+                promoted.append(user)
+        return promoted
+    
+    @staticmethod
+    def notify_promoted(promoted, event):
+        for user in promoted:
+            try:
+                StudentViewModel._after_admission(user, event)
+            except Exception:
+                current_app.logger.exception("Waitlist promotion notification failed")
+    
+    @staticmethod
+    def join_waitlist(user, event_id):
+        """Queue a student for a full event"""
+        try:
+            event = Event.query.get_or_404(event_id)
+            
+            if StudentViewModel.is_registered(user, event.id):
+                return False, "Already registered for this event"
+            
+            if event.is_past:
+                return False, "Cannot join the waitlist for past events"
+            
+            if not event.is_full:
+                return False, "Event still has free seats, register instead"
+            
+            position = Waitlist.position(user.id, event.id)
+            if position is not None:
+                return False, f"Already on the waitlist (position {position})"
+            
+            position = Waitlist.join(user.id, event.id)
+            db.session.commit()
+            return True, f"Joined the waitlist at position {position}"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Joining the waitlist failed: {str(e)}"
+    
+    @staticmethod
+    def leave_waitlist(user, event_id):
+        """Remove a student from an event's waitlist"""
+        try:
+            if not Waitlist.leave(user.id, event_id):
+                return False, "Not on the waitlist for this event"
+            db.session.commit()
+            return True, "Left the waitlist"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Leaving the waitlist failed: {str(e)}"
+    
+    @staticmethod
+    def get_waitlist_position(user, event_id):
+        return Waitlist.position(user.id, event_id)
+    
     @staticmethod
     def unregister_from_event(user, event_id):
         """Unregister user from an event"""
         try:
             event = Event.query.get_or_404(event_id)
             
-            if user in event.registered_users:
-                event.registered_users.remove(user)
-                db.session.commit()
-                return True, "Successfully unregistered from the event"
-            else:
+            registered_at = db.session.execute(
+                select(event_registrations.c.registered_at).where(
+                    event_registrations.c.user_id == user.id,
+                    event_registrations.c.event_id == event.id
+                )
+            ).first()
+            if registered_at is None:
                 return False, "Not registered for this event"
+            
+            EventSimilarityIndex.record_unregistration(user.id, event.id)
+            UserRecommendation.query.filter_by(user_id=user.id).delete()
+            UserPreferenceProfile.get_or_build(user.id).record_unregistration(event)
+            db.session.execute(event_registrations.delete().where(
+                event_registrations.c.user_id == user.id,
+                event_registrations.c.event_id == event.id
+            ))
+            StudentViewModel._release_seat(event.id)
+            TrendingIndex.record_unregistration(
+                event.id, registered_at[0],
+                half_life_hours=current_app.config.get('TRENDING_HALF_LIFE_HOURS', 24)
+            )
+            promoted = StudentViewModel.promote_waitlist(event)
+            db.session.commit()
+            StudentViewModel.publish_statuses([event.id])
+            recommendation_cache.invalidate_user(user.id)
+            minhash_index.record_unregistration(user.id, event.id)
+            StudentViewModel.notify_promoted(promoted, event)
+            return True, "Successfully unregistered from the event"
         except Exception as e:
             db.session.rollback()
             return False, f"Unregistration failed: {str(e)}"
     
+    @staticmethod
+    def get_event_statuses(event_ids):
+        """Live status of many events from one query, keyed by event id"""
+        if not event_ids:
+            return {}
+        now = datetime.now()
+        rows = db.session.execute(
+            select(
+                Event.id, Event.starts_at, Event.ends_at, Event.registration_count, Event.max_capacity
+            ).where(Event.id.in_(list(event_ids)))
+        ).all()
+        
+        statuses = {}
+        for row in rows:
+            statuses[row.id] = StudentViewModel.status_at({
+                'event_id': row.id,
+                'starts_at': row.starts_at.isoformat(),
+                'ends_at': row.ends_at.isoformat(),
+                'registration_count': row.registration_count,
+                'max_capacity': row.max_capacity,
+                'is_full': row.registration_count >= row.max_capacity
+            }, now)
+        return statuses
+    
+    @staticmethod
+    def status_at(status, now):
+        """Set the time-dependent fields of an event status (upcoming -> ongoing -> ended)"""
+        starts_at = datetime.fromisoformat(status['starts_at'])
+        ends_at = datetime.fromisoformat(status['ends_at'])
+        status['is_ongoing'] = starts_at <= now <= ends_at
+        status['is_past'] = starts_at < now
+        status['phase'] = 'ongoing' if status['is_ongoing'] else 'ended' if now > ends_at else 'upcoming'
+        return status
+    
+    @staticmethod
+    def publish_statuses(event_ids):
+        """Push the committed status of events to live stream subscribers"""
+        try:
+            for event_id, status in StudentViewModel.get_event_statuses(event_ids).items():
+                event_broker.publish(event_id, status)
+        except Exception:
+            current_app.logger.exception("Publishing event status failed")
+    
     @staticmethod
     def get_user_registered_events(user):
         """Get events user is registered for"""
         return user.registered_events
     
+    @staticmethod
+    def _registered_events_query(user):
+        return Event.query.join(
+            event_registrations, event_registrations.c.event_id == Event.id
+        ).filter(event_registrations.c.user_id == user.id)
+    
     @staticmethod
     def get_user_upcoming_registered_events(user):
         """Get all upcoming events that the user has registered for"""
-        now = datetime.now()
-        return [event for event in StudentViewModel.get_user_registered_events(user)
-                if datetime.combine(event.start_date, event.start_time) > now]
+        return StudentViewModel._registered_events_query(user).filter(
+            Event.starts_at > datetime.now()
+        ).order_by(Event.starts_at).all()
     
     @staticmethod
     def get_user_past_registered_events(user):
         """Get all past events that the user was registered for"""
-        now = datetime.now()
-        return [event for event in StudentViewModel.get_user_registered_events(user)
-                if datetime.combine(event.start_date, event.start_time) <= now]
+        return StudentViewModel._registered_events_query(user).filter(
+            Event.starts_at <= datetime.now()
+        ).order_by(Event.starts_at.desc()).all()
     
     @staticmethod
     def get_ongoing_events():
-        """Get all events that are currently happening"""
+        """Get all events that are currently happening, including multi-day ones"""
         now = datetime.now()
-        current_time = now.time()
-        current_date = now.date()
-        
-        # Events that started today and haven't ended yet
+        # The lifecycle pass may lag by a tick, so take started events that are
+        # still 'scheduled' too: two short ranges of the (status, starts_at) index
         return Event.query.filter(
-            Event.start_date == current_date,
-            Event.start_time <= current_time,
-            or_(
-                Event.end_date > current_date,
-                and_(Event.end_date == current_date, Event.end_time >= current_time)
-            )
-        ).all()
+            Event.status.in_((Event.SCHEDULED, Event.ONGOING)),
+            Event.starts_at <= now,
+            Event.ends_at >= now
+        ).order_by(Event.starts_at).all()
     
     @staticmethod
     def get_today_events():
         """Get all events scheduled for today"""
-        today = datetime.now().date()
+        today = datetime.combine(date.today(), datetime.min.time())
         return Event.query.filter(
-            Event.start_date == today
-        ).order_by(Event.start_time).all()
+            Event.starts_at >= today,
+            Event.starts_at < today + timedelta(days=1)
+        ).order_by(Event.starts_at).all()
     
     @staticmethod
     def get_dashboard_stats(user):
         """Get statistics for student dashboard"""
-        registered_events = StudentViewModel.get_user_registered_events(user)
-        today = datetime.now().date()
-        
-        stats = {
-            'total_registered': len(registered_events),
-            'upcoming_events': sum(1 for e in registered_events if e.start_date >= today),
-            'events_this_month': sum(1 for e in registered_events if e.start_date.month == today.month and e.start_date.year == today.year),
-            'categories': {}
-        }
-        
-        # Count events by category
-        for event in registered_events:
-            if event.category in stats['categories']:
-                stats['categories'][event.category] += 1
-            else:
-                stats['categories'][event.category] = 1
-                
-        return stats
-    
-    @staticmethod
-    def get_events_by_category(category):
-        """Get events filtered by category"""
+        return StatsViewModel.student_stats(user)
+    
+    @staticmethod
+    def get_events_by_category(category, cursor=None, per_page=None):
+        """Get a page of upcoming events filtered by category"""
         today = date.today()
-        return Event.query.filter(
-            Event.start_date >= today,
-            Event.category == category
-        ).order_by(Event.start_date, Event.start_time).all()
+        return EVENT_KEYSET.page(
+            Event.query.filter(
+                Event.start_date >= today,
+                Event.category == category
+            ), event_key, cursor, StudentViewModel._per_page(per_page)
+        )
     
     @staticmethod
-    def search_events(search_query=None, category=None, start_date=None, end_date=None):
+    def search_events(search_query=None, category=None, start_date=None, end_date=None, cursor=None, per_page=None):
         """Search and filter events"""
-        query = Event.query
-        
-        # Search by title or description
-        if search_query:
-            search = f"%{search_query}%"
-            query = query.filter(
-                or_(
-                    Event.title.ilike(search),
-                    Event.description.ilike(search),
-                    Event.location.ilike(search)
-                )
-            )
+        return StudentViewModel.search_event_results(
+            search_query, category, start_date, end_date, cursor, per_page
+        ).map(lambda result: result[0])
+    
+    @staticmethod
+    def search_event_results(search_query=None, category=None, start_date=None, end_date=None, cursor=None, per_page=None):
+        """Page of full-text search results as (event, highlighted snippet) pairs, best match first"""
+        filters = []
         
         # Filter by category
         if category and category != 'all':
-            query = query.filter(Event.category == category)
+            filters.append(Event.category == category)
             
         # Filter by date range
         if start_date:
-            query = query.filter(Event.start_date >= start_date)
+            filters.append(Event.start_date >= start_date)
         if end_date:
-            query = query.filter(Event.start_date <= end_date)
-            
-        # Order by date and time
-        return query.order_by(Event.start_date, Event.start_time).all()
+            filters.append(Event.start_date <= end_date)
+        
+        return EventSearch.search(
+            search_query, filters, cursor=cursor, per_page=StudentViewModel._per_page(per_page),
+            options=EVENT_LIST
+        )
     
-    # Enhanced recommendation methods with debugging
+    # Recommendation methods
     @staticmethod
     def get_user_recommendations(user, limit=5):
-        """Get personalized recommendations for user with debugging"""
+        """Get personalized recommendations for user"""
         try:
-            print(f"Getting recommendations for user: {user.username}")
-            print(f"User registered events: {[e.title for e in user.registered_events]}")
+            cached = recommendation_cache.get(user.id, limit)
+            if cached is not None:
+                return StudentViewModel._hydrate_recommendations(cached)
             
-            recommendations = reccomendation_engine.get_user_recommendations(user, limit)
-            
-            print(f"Generated {len(recommendations)} recommendations:")
-            for i, rec in enumerate(recommendations):
-                print(f"{i+1}. {rec['event'].title} - Score: {rec['score']:.3f} - {rec['reason']}")
+            recommendations = StudentViewModel._get_precomputed_recommendations(user, limit)
+            if len(recommendations) < limit:
+                # No batch rows, or some are for events that started since the batch ran: top up live
+                seen = {rec['event'].id for rec in recommendations}
+                recommendations += [
+                    rec for rec in reccomendation_engine.get_user_recommendations(user, limit + len(seen))
+                    if rec['event'].id not in seen
+                ][:limit - len(recommendations)]
             
+            recommendation_cache.set(user.id, limit, [
+                (rec['event'].id, rec['score'], rec['reason']) for rec in recommendations
+            ])
             return recommendations
-        except Exception as e:
-            print(f"Error getting recommendations: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            current_app.logger.exception("Error getting recommendations")
             # Fallback: return some upcoming events
             return StudentViewModel._get_fallback_recommendations(user, limit)
     
+    @staticmethod
+    def _get_precomputed_recommendations(user, limit):
+        """Read the offline batch results for a user with one indexed query"""
+        rows = db.session.query(UserRecommendation, Event).join(
+            Event, UserRecommendation.event_id == Event.id
+        ).filter(
+            UserRecommendation.user_id == user.id,
+            Event.start_date >= date.today()
+        ).order_by(UserRecommendation.rank).limit(limit).all()
+        
+        return [{
+            'event': event,
+            'score': rec.score,
+            'reason': rec.reason
+        } for rec, event in rows]
+    
+    @staticmethod
+    def _hydrate_recommendations(items):
+        """Turn cached (event_id, score, reason) tuples back into recommendation dicts"""
+        if not items:
+            return []
+        events = {event.id: event for event in Event.query.filter(
+            Event.id.in_([event_id for event_id, _, _ in items])
+        ).all()}
+        return [{
+            'event': events[event_id],
+            'score': score,
+            'reason': reason
+        } for event_id, score, reason in items if event_id in events]
+    
     @staticmethod
     def get_trending_events(limit=10):
-        """Get trending events with debugging"""
+        """Get trending events"""
         try:
-            trending = reccomendation_engine.get_trending_events(limit)
-            print(f"Generated {len(trending)} trending events")
-            return trending
-        except Exception as e:
-            print(f"Error getting trending events: {e}")
-            import traceback
-            traceback.print_exc()
+            return reccomendation_engine.get_trending_events(limit)
+        except Exception:
+            current_app.logger.exception("Error getting trending events")
             # Fallback: return recent events
             upcoming_events = Event.query.filter(
                 Event.start_date >= date.today()
             ).order_by(Event.start_date).limit(limit).all()
             
-            return [{'event': event, 'registration_count': len(event.registered_users)} 
+            return [{'event': event, 'registration_count': event.registration_count} 
                    for event in upcoming_events]
     
     @staticmethod
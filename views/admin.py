@@ -2,12 +2,15 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from viewmodels.admin_viewmodel import AdminViewModel
+from extensions import recommendation_cache
 from datetime import datetime
 import os
 from models import db
 from models.event import Event
+from models.certificate import CertificateJob
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 import json
+from utils.pagination import InvalidCursor, json_page
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -18,9 +21,15 @@ def require_admin():
         flash('Access denied. Admins only.', 'error')
         return redirect(url_for('student.dashboard'))
 
+@admin_bp.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify({'success': False, 'message': 'Invalid pagination cursor'}), 400
+
 @admin_bp.route('/dashboard')
 def dashboard():
-    events = AdminViewModel.get_admin_events(current_user)
+    events = AdminViewModel.get_admin_events(current_user, cursor=request.args.get('cursor'))
+    if request.args.get('format') == 'json':
+        return json_page(events, 'admin/_event_rows.html', events=events)
     stats = AdminViewModel.get_admin_stats(current_user)
     return render_template('admin/dashboard.html', events=events, stats=stats)
 
@@ -221,27 +230,24 @@ def search_events():
     location = request.args.get('location')
     time = request.args.get('time')
 
-    # Start with base query
-    query = Event.query
-
-    # Apply filters
-    if search_query:
-        query = query.filter(Event.title.ilike(f'%{search_query}%'))
-    if selected_category != 'all':
-        query = query.filter(Event.category == selected_category)
-    if start_date:
-        query = query.filter(Event.start_date >= datetime.strptime(start_date, '%Y-%m-%d'))
-    if end_date:
-        query = query.filter(Event.end_date <= datetime.strptime(end_date, '%Y-%m-%d'))
-    if location:
-        query = query.filter(Event.location.ilike(f'%{location}%'))
-    if time:
-        query = query.filter(Event.start_time.ilike(f'%{time}%'))
-
-    events = query.order_by(Event.start_date.desc()).all()
+    results = AdminViewModel.search_events(
+        search_query=search_query,
+        category=selected_category,
+        start_date=datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+        end_date=datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None,
+        location=location,
+        start_time=time,
+        cursor=request.args.get('cursor')
+    )
+    events = results.map(lambda result: result[0])
+    snippets = {event.id: snippet for event, snippet in results if snippet}
+
+    if request.args.get('format') == 'json':
+        return json_page(results, '_search_results.html', events=events, snippets=snippets, user_type='admin')
 
     return render_template('search_events.html',
                          events=events,
+                         snippets=snippets,
                          search_query=search_query,
                          selected_category=selected_category,
                          start_date=start_date,
@@ -250,10 +256,52 @@ def search_events():
                          start_time=time,
                          user_type='admin')
 
+@admin_bp.route('/api/recommendation-cache')
+def recommendation_cache_stats():
+    """Hit rate and eviction counters of this worker's recommendation cache"""
+    return jsonify(recommendation_cache.stats())
+
+@admin_bp.route('/notifications')
+def notifications():
+    runs = AdminViewModel.get_notification_runs(current_user)
+    if request.args.get('format') == 'json':
+        return jsonify({'runs': [{
+            'id': run.id,
+            'event_id': run.event_id,
+            'kind': run.kind,
+            'status': run.status,
+            'total': run.total,
+            'sent': run.sent,
+            'failed': run.failed
+        } for run in runs]})
+    return render_template('admin/notifications.html', runs=runs)
+
 @admin_bp.route('/event/<int:event_id>')
 def event_detail(event_id):
     event = Event.query.get_or_404(event_id)
-    return render_template('admin/event_detail.html', event=event)
+    certificate_job = CertificateJob.latest(event_id=event.id)
+    return render_template('admin/event_detail.html', event=event, certificate_job=certificate_job)
+
+@admin_bp.route('/event/<int:event_id>/certificates', methods=['POST'])
+def generate_event_certificates(event_id):
+    event = Event.query.get_or_404(event_id)
+    
+    # Check if current admin owns this event
+    if event.creator != current_user:
+        flash('Access denied. You can only generate certificates for your own events.', 'error')
+        return redirect(url_for('admin.dashboard'))
+    
+    success, message = AdminViewModel.queue_event_certificates(event, current_user)
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('admin.event_detail', event_id=event_id))
+
+@admin_bp.route('/certificate-jobs/<int:job_id>')
+def certificate_job(job_id):
+    """Progress of a bulk certificate job, polled by the event page"""
+    job = CertificateJob.query.get_or_404(job_id)
+    if job.requested_by_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(job.to_dict())
 
 # utils/file_utils.py
 def save_files(files, folder):
@@ -0,0 +1,109 @@
+import hashlib
+import json
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_login import login_required
+from models import db
+from viewmodels.student_viewmodel import StudentViewModel
+from extensions import event_broker
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+@api_bp.before_request
+@login_required
+def require_login():
+    pass
+
+def _requested_event_ids():
+    """Sorted event ids of the ids query argument, or an error response"""
+    try:
+        event_ids = sorted({int(part) for part in request.args.get('ids', '').split(',') if part.strip()})
+    except ValueError:
+        return None, (jsonify({'success': False, 'message': 'ids must be a comma-separated list of integers'}), 400)
+    
+    max_ids = current_app.config.get('EVENT_STATUS_MAX_IDS', 200)
+    if len(event_ids) > max_ids:
+        return None, (jsonify({'success': False, 'message': f'At most {max_ids} events per request'}), 400)
+    return event_ids, None
+
+@api_bp.route('/events/status')
+def event_statuses():
+    """Status, registration count and fullness of many events: /api/events/status?ids=1,2,3
+    
+    The response carries an ETag of its content; polls sending it back in
+    If-None-Match get 304 Not Modified with no body while nothing changed.
+    """
+    event_ids, error = _requested_event_ids()
+    if error:
+        return error
+    
+    statuses = StudentViewModel.get_event_statuses(event_ids)
+    body = json.dumps({
+        'success': True,
+        'events': {str(event_id): status for event_id, status in statuses.items()}
+    }, sort_keys=True)
+    
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, sort_keys=True)}\n\n"
+
+@api_bp.route('/events/stream')
+def event_stream():
+    """Server-sent events for many events: /api/events/stream?ids=1,2,3
+    
+    Sends a ``snapshot`` of every status, then a ``status`` message whenever
+    a registration count changes or an event goes upcoming -> ongoing -> ended.
+    Idle streams get a keepalive comment every EVENT_STREAM_HEARTBEAT seconds.
+    """
+    event_ids, error = _requested_event_ids()
+    if error:
+        return error
+    
+    # Subscribe before reading the snapshot, so a change committed in between is delivered
+    subscription = event_broker.subscribe(event_ids)
+    try:
+        statuses = StudentViewModel.get_event_statuses(event_ids)
+    except Exception:
+        event_broker.unsubscribe(subscription)
+        raise
+    # The stream can stay open for hours; don't pin a pooled connection to it
+    db.session.remove()
+    heartbeat = current_app.config.get('EVENT_STREAM_HEARTBEAT', 15)
+    
+    def stream():
+        try:
+            yield _sse('snapshot', {str(event_id): status for event_id, status in statuses.items()})
+            while True:
+                now = datetime.now()
+                # Wake up for the next phase change even when nobody registers
+                boundaries = [
+                    datetime.fromisoformat(boundary)
+                    for status in statuses.values()
+                    for boundary in (status['starts_at'], status['ends_at'])
+                    if datetime.fromisoformat(boundary) > now
+                ]
+                timeout = min([heartbeat] + [(b - now).total_seconds() + 1 for b in boundaries])
+                
+                messages = []
+                for event_id, status in subscription.get(timeout).items():
+                    statuses[event_id] = status
+                    messages.append(_sse('status', status))
+                
+                now = datetime.now()
+                for status in statuses.values():
+                    phase = status['phase']
+                    if StudentViewModel.status_at(status, now)['phase'] != phase:
+                        messages.append(_sse('status', status))
+                
+                yield ''.join(messages) or ': keepalive\n\n'
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -10,8 +10,10 @@ from werkzeug.utils import secure_filename
 import os
 from models import db
 from models.event import Event
+from models.certificate import CertificateJob
 from sqlalchemy import not_
 from flask import send_file
+from utils.pagination import InvalidCursor, Page, json_page
 
 student_bp = Blueprint('student', __name__, url_prefix='/student')
 
@@ -22,12 +24,18 @@ def require_student():
         flash('Access denied. Students only.', 'error')
         return redirect(url_for('admin.dashboard'))
 
+@student_bp.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify({'success': False, 'message': 'Invalid pagination cursor'}), 400
+
 # Single dashboard route with recommendation features
 @student_bp.route('/dashboard')
 @login_required
 def dashboard():
     registered_events = StudentViewModel.get_user_upcoming_registered_events(current_user)
-    upcoming_events = StudentViewModel.get_upcoming_events()[:6]
+    upcoming_events = StudentViewModel.get_upcoming_events(
+        per_page=current_app.config.get('DASHBOARD_UPCOMING_EVENTS', 6)
+    )
     ongoing_events = StudentViewModel.get_ongoing_events()
     today_events = StudentViewModel.get_today_events()
     stats = StudentViewModel.get_dashboard_stats(current_user)
@@ -51,17 +59,22 @@ def events():
     category = request.args.get('category', '')
     search = request.args.get('search', '')
     status = request.args.get('status', '')
+    cursor = request.args.get('cursor')
     
     if search:
-        upcoming_events = StudentViewModel.search_events(search)
+        upcoming_events = StudentViewModel.search_events(search, cursor=cursor)
     elif category:
-        upcoming_events = StudentViewModel.get_events_by_category(category)
+        upcoming_events = StudentViewModel.get_events_by_category(category, cursor=cursor)
+    # Ongoing and today's events are small sets: served as a single, final page
     elif status == 'ongoing':
-        upcoming_events = StudentViewModel.get_ongoing_events()
+        upcoming_events = Page(StudentViewModel.get_ongoing_events())
     elif status == 'today':
-        upcoming_events = StudentViewModel.get_today_events()
+        upcoming_events = Page(StudentViewModel.get_today_events())
     else:
-        upcoming_events = StudentViewModel.get_upcoming_events()
+        upcoming_events = StudentViewModel.get_upcoming_events(cursor=cursor)
+    
+    if request.args.get('format') == 'json':
+        return json_page(upcoming_events, 'student/_event_cards.html', events=upcoming_events)
     
     return render_template('student/events.html', 
                          events=upcoming_events,
@@ -70,10 +83,12 @@ def events():
 @student_bp.route('/event/<int:event_id>')
 def event_detail(event_id):
     event = StudentViewModel.get_event_by_id(event_id)
-    is_registered = current_user in event.registered_users
+    is_registered = StudentViewModel.is_registered(current_user, event.id)
+    waitlist_position = None if is_registered else StudentViewModel.get_waitlist_position(current_user, event.id)
     return render_template('student/event_detail.html', 
                          event=event, 
-                         is_registered=is_registered)
+                         is_registered=is_registered,
+                         waitlist_position=waitlist_position)
 
 @student_bp.route('/register/<int:event_id>', methods=['POST'])
 def register_event(event_id):
@@ -95,6 +110,35 @@ def unregister_event(event_id):
     flash(message, 'success' if success else 'error')
     return redirect(url_for('student.event_detail', event_id=event_id))
 
+@student_bp.route('/waitlist/<int:event_id>', methods=['POST'])
+def join_waitlist(event_id):
+    success, message = StudentViewModel.join_waitlist(current_user, event_id)
+    
+    if request.headers.get('Content-Type') == 'application/json':
+        return jsonify({'success': success, 'message': message,
+                        'position': StudentViewModel.get_waitlist_position(current_user, event_id)})
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('student.event_detail', event_id=event_id))
+
+@student_bp.route('/waitlist/<int:event_id>/leave', methods=['POST'])
+def leave_waitlist(event_id):
+    success, message = StudentViewModel.leave_waitlist(current_user, event_id)
+    
+    if request.headers.get('Content-Type') == 'application/json':
+        return jsonify({'success': success, 'message': message})
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('student.event_detail', event_id=event_id))
+
+@student_bp.route('/api/waitlist/<int:event_id>')
+def waitlist_position_api(event_id):
+    """Queue position of the current student (null when not waitlisted)"""
+    return jsonify({
+        'success': True,
+        'position': StudentViewModel.get_waitlist_position(current_user, event_id)
+    })
+
 @student_bp.route('/my-events')
 def my_events():
     upcoming_events = StudentViewModel.get_user_upcoming_registered_events(current_user)
@@ -169,16 +213,23 @@ def search_events():
     if end_date:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-    events = StudentViewModel.search_events(
+    results = StudentViewModel.search_event_results(
         search_query=search_query,
         category=category,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        cursor=request.args.get('cursor')
     )
+    events = results.map(lambda result: result[0])
+    snippets = {event.id: snippet for event, snippet in results if snippet}
+    
+    if request.args.get('format') == 'json':
+        return json_page(results, '_search_results.html', events=events, snippets=snippets, user_type='student')
     
     return render_template('search_events.html',
                           search_query=search_query,
                           events=events,
+                          snippets=snippets,
                           selected_category=category,
                           start_date=start_date,
                           end_date=end_date,
@@ -205,7 +256,7 @@ def debug_recommendations():
     # Get some test data
     debug_info = {
         'user_events': current_user.registered_events,
-        'upcoming_events_count': len(StudentViewModel.get_upcoming_events()),
+        'upcoming_events_count': Event.query.filter(Event.start_date >= date.today()).count(),
         'available_events': [],
         'recommendations': [],
         'trending': []
@@ -260,10 +311,16 @@ def certificates():
     # Get pending events (not yet completed)
     pending_events = cert_generator.get_user_pending_events(current_user)
     
+    # A bulk generation still running in the background
+    certificate_job = CertificateJob.latest(user_id=current_user.id)
+    if certificate_job is not None and certificate_job.finished:
+        certificate_job = None
+    
     return render_template('student/certificates.html', 
                          certificates=user_certificates,
                          eligible_events=eligible_events,
-                         pending_events=pending_events)
+                         pending_events=pending_events,
+                         certificate_job=certificate_job)
 
 @student_bp.route('/download-certificate/<cert_id>')
 @login_required
@@ -313,28 +370,32 @@ def generate_single_certificate(event_id):
 @student_bp.route('/generate-all-certificates')
 @login_required
 def generate_all_certificates():
-    """Generate certificates for all eligible events"""
+    """Queue certificates for all eligible events; they are rendered in the background"""
     if cert_generator is None:
         init_certificate_generator()
     
+    job = CertificateJob.latest(user_id=current_user.id)
+    if job is not None and not job.finished:
+        flash('Your certificates are already being generated', 'info')
+        return redirect(url_for('student.certificates'))
+    
     eligible_events = cert_generator.get_user_eligible_events(current_user)
-    generated = 0
-    errors = 0
-    
-    for event_data in eligible_events:
-        event = event_data['event']
-        try:
-            cert_generator.generate_certificate(current_user, event)
-            generated += 1
-        except Exception as e:
-            print(f"Error generating certificate for {event.title}: {e}")
-            errors += 1
-    
-    if generated > 0:
-        flash(f'Generated {generated} certificate(s) successfully!', 'success')
-    if errors > 0:
-        flash(f'{errors} certificate(s) could not be generated', 'warning')
-    if generated == 0 and errors == 0:
+    if not eligible_events:
         flash('No new certificates to generate', 'info')
+        return redirect(url_for('student.certificates'))
+    
+    try:
+        cert_generator.create_job(current_user, user_id=current_user.id)
+        flash(f'Generating {len(eligible_events)} certificate(s)...', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error generating certificates: {str(e)}', 'error')
     
-    return redirect(url_for('student.certificates'))
\ No newline at end of file
+    return redirect(url_for('student.certificates'))
+
+@student_bp.route('/certificate-jobs/<int:job_id>')
+@login_required
+def certificate_job(job_id):
+    """Progress of the user's bulk certificate job, polled by the certificates page"""
+    job = CertificateJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
\ No newline at end of file